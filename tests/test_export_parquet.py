@@ -0,0 +1,124 @@
+"""Tests for tools.export_parquet utilities."""
+from __future__ import annotations
+
+import concurrent.futures
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.export_parquet import DATASETS, ParquetExporter, export_dataset, main
+
+
+def _rows(facility_counts: dict[str, int]) -> list[dict]:
+    rows = []
+    for facility_cd, count in facility_counts.items():
+        for idx in range(count):
+            rows.append(
+                {
+                    "facility_cd": facility_cd,
+                    "year_month": "202504",
+                    "inpatient_points": idx,
+                    "outpatient_points": None,
+                    "inclusive_points": 10,
+                    "total_points": idx + 10,
+                }
+            )
+    return rows
+
+
+def test_export_dataset_partitions_and_coalesces(tmp_path: Path) -> None:
+    rows = _rows({"131000001": 25, "131000002": 3, "131000003": 4, "131000004": 2})
+
+    files = export_dataset(
+        rows=rows,
+        dataset=DATASETS["cost_monthly"],
+        output_dir=tmp_path,
+        yyyymm="202504",
+        batch_rows=7,
+        row_group_rows=5,
+        max_file_rows=10,
+        workers=3,
+    )
+
+    dataset_dir = tmp_path / "yyyymm=2025-04" / "cost_monthly"
+    assert (dataset_dir / "_SUCCESS").exists()
+    listing = json.loads((dataset_dir / "_files.json").read_text(encoding="utf-8"))
+    assert listing["total_rows"] == 34
+    assert [item["path"] for item in listing["files"]] == [item.path for item in files]
+
+    by_path = {item.path: item for item in files}
+    large = [by_path[f"facility_131000001_part-{idx:05d}.parquet"] for idx in range(3)]
+    assert [item.rows for item in large] == [10, 10, 5]
+    assert all(item.facilities == ["131000001"] for item in large)
+
+    shared = by_path["shared_part-00000.parquet"]
+    assert shared.rows == 9
+    assert shared.facilities == ["131000002", "131000003", "131000004"]
+    assert len(files) == 4
+
+    for item in files:
+        parquet_file = pq.ParquetFile(dataset_dir / item.path)
+        assert parquet_file.metadata.num_rows == item.rows
+        assert parquet_file.metadata.num_row_groups == item.row_groups
+        assert all(
+            parquet_file.metadata.row_group(idx).num_rows <= 5 for idx in range(item.row_groups)
+        )
+
+
+def test_small_facilities_are_written_while_streaming(tmp_path: Path) -> None:
+    facilities = [f"1310000{idx:02d}" for idx in range(30)]
+    rows = _rows({facility_cd: 3 for facility_cd in facilities})
+    exporter = ParquetExporter(
+        DATASETS["cost_monthly"], tmp_path, row_group_rows=10, max_file_rows=20, workers=4
+    )
+
+    for start in range(0, len(rows), 9):
+        exporter.add_batch(rows[start : start + 9])
+    concurrent.futures.wait(exporter._futures)
+    written_before_finish = sorted(path.name for path in tmp_path.glob("shared_part-*.parquet"))
+    files = exporter.finish()
+
+    assert len(written_before_finish) >= 4
+    assert [item.path for item in files] == [f"shared_part-{idx:05d}.parquet" for idx in range(5)]
+    assert [item.rows for item in files] == [20, 20, 20, 20, 10]
+    assert sorted({facility for item in files for facility in item.facilities}) == facilities
+    for item in files:
+        assert pq.ParquetFile(tmp_path / item.path).metadata.num_rows == item.rows
+
+
+def test_main_with_source_csv(tmp_path: Path) -> None:
+    source = tmp_path / "case_summary.csv"
+    source.write_text(
+        "facility_cd,data_id,dpc_code,length_of_stay,total_points,readmit_30d_flag,acuity_avg\n"
+        "131000123,0000000001,040080xx99x0xx,5,12000,true,1.250\n"
+        "131000123,0000000002,040080xx99x0xx,,8000,false,\n",
+        encoding="utf-8",
+    )
+    output = tmp_path / "processed"
+
+    exit_code = main(
+        [
+            "--yyyymm",
+            "202504",
+            "--dataset",
+            "case_summary",
+            "--source-csv",
+            str(source),
+            "--output-dir",
+            str(output),
+        ]
+    )
+
+    assert exit_code == 0
+    table = pq.read_table(output / "yyyymm=2025-04" / "case_summary" / "shared_part-00000.parquet")
+    assert table.column("readmit_30d_flag").to_pylist() == [True, False]
+    assert table.column("length_of_stay").to_pylist() == [5, None]
+    assert str(table.column("acuity_avg")[0]) == "1.250"
@@ -1,19 +1,28 @@
 """Tests for tools.generate_manifest utilities."""
 from __future__ import annotations
 
+import gzip
+import hashlib
 import json
 import sys
 from pathlib import Path
 
+import pytest
+
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+import tools.generate_manifest as generate_manifest
 from tools.generate_manifest import (
+    RAW_COLUMNS,
     compute_hash,
+    detect_compression,
     detect_records,
     evaluate_target_structure,
     main,
+    merge_column_stats,
+    scan_data_file,
 )
 
 
@@ -85,6 +94,8 @@ def test_main_creates_manifest(tmp_path: Path) -> None:
     assert manifest["records"] == 1
     assert manifest["hash"]["algorithm"] == "SHA256"
     assert "value" in manifest["hash"]
+    assert manifest["bytes"] == data.stat().st_size
+    assert ("column_stats" in manifest) == (generate_manifest.pyarrow is not None)
 
 
 def test_main_strict_path_enforces_structure(tmp_path: Path) -> None:
@@ -111,3 +122,248 @@ def test_main_strict_path_enforces_structure(tmp_path: Path) -> None:
     assert exit_code == 1
     assert not (target / "_manifest.json").exists()
 
+
+def test_scan_data_file_plain_matches_separate_passes(tmp_path: Path) -> None:
+    data = tmp_path / "plain.csv"
+    data.write_text("col\n1\n2", encoding="utf-8")
+
+    result = scan_data_file(data, "SHA256", has_header=True)
+
+    assert result.records == detect_records(data, has_header=True) == 2
+    assert result.hash_value == compute_hash(data, "SHA256")
+    assert result.compression is None
+
+
+def test_scan_data_file_gzip(tmp_path: Path) -> None:
+    payload = b"col\n" + b"".join(f"{idx}\n".encode() for idx in range(50000))
+    data = tmp_path / "data.csv.gz"
+    # Two concatenated members, as produced by appending gzip outputs.
+    data.write_bytes(gzip.compress(payload[:1000]) + gzip.compress(payload[1000:]))
+
+    result = scan_data_file(data, "SHA256", has_header=True)
+
+    assert detect_compression(data) == "gzip"
+    assert result.records == 50000
+    assert result.hash_value == hashlib.sha256(data.read_bytes()).hexdigest()
+    assert result.uncompressed_bytes == len(payload)
+    assert detect_records(data, has_header=True) == 50000
+
+
+def test_scan_data_file_zstd(tmp_path: Path) -> None:
+    zstandard = pytest.importorskip("zstandard")
+    payload = b"col\n1\n2\n"
+    data = tmp_path / "data.csv.zst"
+    data.write_bytes(zstandard.ZstdCompressor().compress(payload))
+
+    result = scan_data_file(data, "MD5", has_header=True)
+
+    assert result.compression == "zstd"
+    assert result.records == 2
+    assert result.uncompressed_bytes == len(payload)
+
+
+def test_scan_data_file_truncated_gzip(tmp_path: Path) -> None:
+    data = tmp_path / "broken.csv.gz"
+    data.write_bytes(gzip.compress(b"col\n1\n2\n" * 100)[:-12])
+
+    with pytest.raises(ValueError):
+        scan_data_file(data, "SHA256", has_header=True)
+
+
+def test_scan_data_file_counts_lines_like_text_mode(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(generate_manifest, "CHUNK_SIZE", 3)
+    for payload in (b"col\r1\r2\r", b"col\r\n1\r\n2", b"col\n1\r\r2\n", b"co\r\n\r\n"):
+        data = tmp_path / "lines.csv"
+        data.write_bytes(payload)
+
+        result = scan_data_file(data, "SHA256", has_header=True)
+
+        assert result.records == detect_records(data, has_header=True), payload
+
+
+def test_scan_data_file_gzip_zero_padding(tmp_path: Path) -> None:
+    data = tmp_path / "padded.csv.gz"
+    data.write_bytes(gzip.compress(b"col\n1\n2\n") + b"\x00" * 512)
+
+    result = scan_data_file(data, "SHA256", has_header=True)
+
+    assert result.records == detect_records(data, has_header=True) == 2
+
+
+def test_corrupt_zstd_raises_value_error(tmp_path: Path) -> None:
+    zstandard = pytest.importorskip("zstandard")
+    data = tmp_path / "broken.csv.zst"
+    frame = zstandard.ZstdCompressor().compress(b"col\n1\n2\n" * 100)
+    data.write_bytes(frame[:6] + b"\xff" * 16 + frame[22:])
+
+    with pytest.raises(ValueError):
+        scan_data_file(data, "SHA256", has_header=True)
+    with pytest.raises(ValueError):
+        detect_records(data, has_header=True)
+
+
+def test_main_records_compression(tmp_path: Path) -> None:
+    target = tmp_path / "raw" / "yyyymm=2025-04" / "y1"
+    data = tmp_path / "data.csv.gz"
+    data.write_bytes(gzip.compress(b"col\n1\n"))
+
+    exit_code = main(
+        [
+            str(target),
+            "--facility",
+            "131000123",
+            "--yyyymm",
+            "202504",
+            "--file-type",
+            "y1",
+            "--data-file",
+            str(data),
+            "--has-header",
+        ]
+    )
+
+    assert exit_code == 0
+    manifest = json.loads((target / "_manifest.json").read_text(encoding="utf-8"))
+    assert manifest["records"] == 1
+    assert manifest["compression"] == "gzip"
+    assert manifest["uncompressed_bytes"] == 6
+    assert manifest["bytes"] == data.stat().st_size
+
+
+def test_scan_data_file_column_stats_with_header(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(generate_manifest, "CHUNK_SIZE", 7)
+    data = tmp_path / "y1.csv.gz"
+    data.write_bytes(
+        gzip.compress(
+            b"facility_cd,data_id,admission_date,discharge_date\r\n"
+            b"131000123,0000000001,2025-04-03,2025-04-10\r\n"
+            b"131000456,0000000002,2025-03-28,\r\n"
+            b"131000123,0000000003,2025-04-01,2025-04-20\r\n"
+        )
+    )
+
+    result = scan_data_file(data, "SHA256", has_header=True, collect_stats=True)
+
+    assert result.records == 3
+    assert result.column_stats == {
+        "min_max": {
+            "admission_date": {"min": "2025-03-28", "max": "2025-04-03"},
+            "discharge_date": {"min": "2025-04-10", "max": "2025-04-20"},
+        },
+        "distinct": {"facility_cd": ["131000123", "131000456"]},
+        "null_counts": {"facility_cd": 0, "data_id": 0, "admission_date": 0, "discharge_date": 1},
+    }
+
+
+def test_scan_data_file_column_stats_without_header(tmp_path: Path) -> None:
+    data = tmp_path / "ef.csv"
+    data.write_text("131000123,0000000001,1,1,20250402,A\n", encoding="utf-8")
+
+    result = scan_data_file(
+        data, "SHA256", has_header=False, collect_stats=True, columns=RAW_COLUMNS["ef_in"]
+    )
+
+    assert result.column_stats["min_max"] == {"service_date": {"min": "20250402", "max": "20250402"}}
+    assert result.column_stats["null_counts"]["doctor_code"] == 1
+
+
+def test_scan_data_file_column_stats_quoted_newlines(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(generate_manifest, "CHUNK_SIZE", 5)
+    data = tmp_path / "y1.csv"
+    data.write_bytes(
+        b'facility_cd,note,admission_date\n'
+        b'131000123,"line one\nline ""two""\n",2025-04-03\n'
+        b'131000456,,2025-04-01\n'
+    )
+
+    result = scan_data_file(data, "SHA256", has_header=True, collect_stats=True)
+
+    assert result.column_stats["min_max"] == {"admission_date": {"min": "2025-04-01", "max": "2025-04-03"}}
+    assert result.column_stats["distinct"] == {"facility_cd": ["131000123", "131000456"]}
+    assert result.column_stats["null_counts"] == {"facility_cd": 0, "note": 1, "admission_date": 0}
+
+
+def test_scan_data_file_column_stats_unbalanced_quote(tmp_path: Path, monkeypatch, caplog) -> None:
+    monkeypatch.setattr(generate_manifest, "CHUNK_SIZE", 64)
+    monkeypatch.setattr(generate_manifest, "MAX_PENDING_BYTES", 256)
+    rows = [f"131000{idx % 7:03d},{idx:010d},2025-04-{idx % 28 + 1:02d}\n" for idx in range(2000)]
+    rows[3] = rows[3].replace(",", ',"', 1)
+    data = tmp_path / "y1.csv"
+    data.write_text("facility_cd,data_id,admission_date\n" + "".join(rows), encoding="utf-8")
+
+    with caplog.at_level("WARNING"):
+        result = scan_data_file(data, "SHA256", has_header=True, collect_stats=True)
+
+    assert result.records == 2000
+    assert "unbalanced quote" in caplog.text
+    assert result.column_stats["distinct"]["facility_cd"][-1] == "131000006"
+    assert result.column_stats["min_max"]["admission_date"]["max"] == "2025-04-28"
+
+
+def test_column_stats_pyarrow_matches_csv_module(tmp_path: Path, monkeypatch) -> None:
+    pytest.importorskip("pyarrow.csv")
+    monkeypatch.setattr(generate_manifest, "CHUNK_SIZE", 32)
+    data = tmp_path / "y1.csv"
+    data.write_bytes(
+        b"facility_cd,note,admission_date\r\n"
+        b'131000123,"a, ""quoted""\nvalue",2025-04-03\r\n'
+        b"131000456,,\r\n"
+        b"131000789,short\r\n"
+        b'131000123,"",2025-03-30\r\n'
+    )
+
+    arrow = scan_data_file(data, "SHA256", has_header=True, collect_stats=True).column_stats
+    monkeypatch.setattr(generate_manifest, "pyarrow", None)
+    rows = scan_data_file(data, "SHA256", has_header=True, collect_stats=True).column_stats
+
+    assert arrow == rows
+    assert rows["null_counts"] == {"facility_cd": 0, "note": 2, "admission_date": 2}
+
+
+def test_main_warns_without_column_layout(tmp_path: Path, capsys) -> None:
+    target = tmp_path / "raw" / "yyyymm=2025-04" / "y4"
+    data = tmp_path / "y4.csv"
+    data.write_text("131000123,1\n", encoding="utf-8")
+
+    exit_code = main(
+        [
+            str(target),
+            "--facility",
+            "131000123",
+            "--yyyymm",
+            "202504",
+            "--file-type",
+            "y4",
+            "--data-file",
+            str(data),
+            "--column-stats",
+            "always",
+        ]
+    )
+
+    assert exit_code == 0
+    assert "no column layout" in capsys.readouterr().err
+    manifest = json.loads((target / "_manifest.json").read_text(encoding="utf-8"))
+    assert "column_stats" not in manifest
+
+
+def test_merge_column_stats() -> None:
+    first = {
+        "min_max": {"service_date": {"min": "20250401", "max": "20250410"}},
+        "distinct": {"facility_cd": ["131000123"]},
+        "null_counts": {"qty": 1},
+    }
+    second = {
+        "min_max": {"service_date": {"min": "20250405", "max": "20250430"}},
+        "distinct": {"facility_cd": ["131000456"]},
+        "null_counts": {"qty": 2},
+    }
+
+    merged = merge_column_stats([first, None, second])
+
+    assert merged == {
+        "min_max": {"service_date": {"min": "20250401", "max": "20250430"}},
+        "distinct": {"facility_cd": ["131000123", "131000456"]},
+        "null_counts": {"qty": 3},
+    }
+    assert merge_column_stats([None]) is None
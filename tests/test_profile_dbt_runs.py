@@ -0,0 +1,120 @@
+"""Tests for tools.profile_dbt_runs utilities."""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.profile_dbt_runs import (
+    detect_regressions,
+    extract_node_timings,
+    load_history,
+    persist_timings,
+    record_run,
+)
+
+MODEL_ID = "model.dpc_learning.stg_y1_case"
+
+
+def _run_results(invocation_id: str, generated_at: str, execution_time: float) -> dict:
+    return {
+        "metadata": {"invocation_id": invocation_id, "generated_at": generated_at},
+        "args": {"which": "run"},
+        "results": [
+            {
+                "unique_id": MODEL_ID,
+                "status": "success",
+                "execution_time": execution_time,
+                "timing": [
+                    {
+                        "name": "compile",
+                        "started_at": "2025-05-01T00:00:00.000000Z",
+                        "completed_at": "2025-05-01T00:00:00.500000Z",
+                    },
+                    {
+                        "name": "execute",
+                        "started_at": "2025-05-01T00:00:00.500000Z",
+                        "completed_at": "2025-05-01T00:00:10.500000Z",
+                    },
+                ],
+                "adapter_response": {"rows_affected": 120},
+            }
+        ],
+    }
+
+
+def test_extract_node_timings() -> None:
+    manifest = {
+        "nodes": {MODEL_ID: {"resource_type": "model", "config": {"materialized": "incremental"}}}
+    }
+
+    timings = extract_node_timings(_run_results("a", "2025-05-01T00:00:11Z", 10.5), manifest, "202504")
+
+    assert len(timings) == 1
+    timing = timings[0]
+    assert timing.command == "run"
+    assert timing.materialized == "incremental"
+    assert timing.compile_time == 0.5
+    assert timing.execute_time == 10.0
+    assert timing.rows_affected == 120
+    assert timing.yyyymm == "202504"
+
+
+def test_detect_regressions_uses_rolling_median() -> None:
+    history = []
+    for idx, seconds in enumerate([10.0, 11.0, 9.0, 10.0]):
+        history.extend(extract_node_timings(_run_results(str(idx), f"2025-05-0{idx + 1}", seconds)))
+
+    slow = extract_node_timings(_run_results("slow", "2025-05-09", 45.0))
+    normal = extract_node_timings(_run_results("ok", "2025-05-09", 14.0))
+
+    regressions = detect_regressions(slow, history)
+    assert [regression.unique_id for regression in regressions] == [MODEL_ID]
+    assert regressions[0].baseline == 10.0
+    assert detect_regressions(normal, history) == []
+    assert detect_regressions(slow, history[:2]) == []
+
+
+def test_record_run_appends_to_store(tmp_path: Path) -> None:
+    store = tmp_path / "timings.jsonl"
+    for idx in range(3):
+        record_run(_run_results(str(idx), f"2025-05-0{idx + 1}", 10.0), None, store)
+
+    _, regressions = record_run(_run_results("slow", "2025-05-09", 60.0), None, store)
+
+    assert len(load_history(store)) == 4
+    assert len(regressions) == 1
+
+
+def test_load_history_skips_malformed_lines(tmp_path: Path) -> None:
+    store = tmp_path / "timings.jsonl"
+    record_run(_run_results("a", "2025-05-01", 10.0), None, store)
+    with store.open("a", encoding="utf-8") as fh:
+        fh.write('{"unexpected": 1}\n{truncated\n')
+    record_run(_run_results("b", "2025-05-02", 10.0), None, store)
+
+    assert [timing.invocation_id for timing in load_history(store)] == ["a", "b"]
+
+
+def test_persist_timings_batches_inserts() -> None:
+    class RecordingRedshift:
+        def __init__(self) -> None:
+            self.statements = []
+
+        def execute(self, sql, parameters=None):
+            self.statements.append((sql, parameters))
+
+    timings = extract_node_timings(_run_results("a", "2025-05-01T00:00:11Z", 10.5)) * 5
+    redshift = RecordingRedshift()
+
+    persist_timings(redshift, timings, "dq.dbt_node_timings", batch_size=2)
+
+    assert len(redshift.statements) == 3
+    sql, parameters = redshift.statements[0]
+    assert sql.count("CAST(") == 2
+    names = [parameter["name"] for parameter in parameters]
+    assert len(names) == len(set(names)) == 24
+    assert len(redshift.statements[-1][1]) == 12
@@ -0,0 +1,86 @@
+"""Tests for the timing capture paths of tools.run_dbt_dq."""
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("boto3")
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tools.run_dbt_dq as run_dbt_dq
+from tools.run_dbt_dq import DQResult, main
+
+TEST_ID = "test.dpc_learning.unique_stg_y1_case_data_id"
+
+
+class FakeRedshift:
+    statements: list = []
+    fail_on: str = ""
+
+    def __init__(self, **kwargs) -> None:
+        pass
+
+    def execute(self, sql, parameters=None):
+        if self.fail_on and self.fail_on in sql:
+            raise RuntimeError("statement failed")
+        FakeRedshift.statements.append(sql)
+
+
+def _prepare(tmp_path: Path, monkeypatch, fail_on: str = "") -> list[str]:
+    target = tmp_path / "target"
+    target.mkdir()
+    run_results = {
+        "metadata": {"invocation_id": "inv", "generated_at": "2025-05-01T00:00:00Z"},
+        "args": {"which": "test"},
+        "results": [{"unique_id": TEST_ID, "status": "fail", "execution_time": 1.5, "timing": []}],
+    }
+    (target / "run_results.json").write_text(json.dumps(run_results), encoding="utf-8")
+    (target / "manifest.json").write_text(json.dumps({"nodes": {}}), encoding="utf-8")
+
+    FakeRedshift.statements = []
+    FakeRedshift.fail_on = fail_on
+    monkeypatch.setattr(run_dbt_dq, "run_dbt_tests", lambda args: 1)
+    monkeypatch.setattr(run_dbt_dq, "RedshiftDataAPI", FakeRedshift)
+    monkeypatch.setattr(
+        run_dbt_dq,
+        "gather_failed_results",
+        lambda **kwargs: [DQResult("131000123", "202504", "PK_DUPLICATE_Y1", "CRITICAL", 2, None, "dup")],
+    )
+    return [
+        "--yyyymm",
+        "202504",
+        "--project-dir",
+        str(tmp_path),
+        "--workgroup-name",
+        "wg",
+        "--database",
+        "dev",
+    ]
+
+
+def test_timings_table_without_store(tmp_path: Path, monkeypatch) -> None:
+    argv = _prepare(tmp_path, monkeypatch)
+
+    exit_code = main(argv + ["--timings-table", "dq.dbt_node_timings"])
+
+    assert exit_code == 0
+    assert any(sql.startswith("INSERT INTO dq.dbt_node_timings") for sql in FakeRedshift.statements)
+    assert any(sql.startswith("INSERT INTO dq.results_yyyymm") for sql in FakeRedshift.statements)
+
+
+def test_timing_failures_do_not_block_dq_results(tmp_path: Path, monkeypatch) -> None:
+    argv = _prepare(tmp_path, monkeypatch, fail_on="dq.dbt_node_timings")
+    store = tmp_path / "timings.jsonl"
+    store.write_text('{"unexpected": 1}\nnot json\n', encoding="utf-8")
+
+    exit_code = main(argv + ["--timings-store", str(store), "--timings-table", "dq.dbt_node_timings"])
+
+    assert exit_code == 0
+    assert any(sql.startswith("INSERT INTO dq.results_yyyymm") for sql in FakeRedshift.statements)
+    assert len(store.read_text(encoding="utf-8").splitlines()) == 3
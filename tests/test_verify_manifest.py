@@ -0,0 +1,169 @@
+"""Tests for tools.verify_manifest utilities."""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.generate_manifest import main as generate_main
+from tools.verify_manifest import main, verify_directory, verify_tree
+
+
+def _prepare(tmp_path: Path, content: str = "col\n1\n2\n") -> Path:
+    target = tmp_path / "raw" / "yyyymm=2025-04" / "y1"
+    target.mkdir(parents=True)
+    data = target / "131000123_202504_y1_001.csv"
+    data.write_text(content, encoding="utf-8")
+    exit_code = generate_main(
+        [
+            str(target),
+            "--facility",
+            "131000123",
+            "--yyyymm",
+            "202504",
+            "--file-type",
+            "y1",
+            "--data-file",
+            str(data),
+            "--has-header",
+        ]
+    )
+    assert exit_code == 0
+    return target
+
+
+def test_verify_directory_multiple_files(tmp_path: Path) -> None:
+    target = _prepare(tmp_path, "col\n1\n2\n")
+    second = target / "131000123_202504_y1_002.csv"
+    second.write_text("col\n3", encoding="utf-8")
+    manifest_path = target / "_manifest.json"
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    digest = hashlib.md5(b"col\n1\n2\n" + b"col\n3").hexdigest()
+    manifest.update(records=3, bytes=manifest["bytes"] + 5, hash={"algorithm": "MD5", "value": digest})
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+
+    result = verify_directory(manifest_path, has_header=True)
+
+    assert result.ok
+    assert len(result.files) == 2
+
+
+def test_verify_directory_rejects_non_integer_counts(tmp_path: Path) -> None:
+    target = _prepare(tmp_path)
+    manifest_path = target / "_manifest.json"
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    manifest["records"] = "2"
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+
+    result = verify_directory(manifest_path, has_header=True)
+
+    assert result.status == "mismatch"
+    assert result.check == "schema"
+
+
+def test_verify_directory_ok(tmp_path: Path) -> None:
+    target = _prepare(tmp_path)
+
+    result = verify_directory(target / "_manifest.json", has_header=True)
+
+    assert result.ok
+    assert result.files == ["131000123_202504_y1_001.csv"]
+
+
+def test_verify_directory_gzip(tmp_path: Path) -> None:
+    target = tmp_path / "raw" / "yyyymm=2025-04" / "y1"
+    target.mkdir(parents=True)
+    data = target / "131000123_202504_y1_001.gz"
+    data.write_bytes(gzip.compress(b"col\n1\n2\n"))
+    exit_code = generate_main(
+        [
+            str(target),
+            "--facility",
+            "131000123",
+            "--yyyymm",
+            "202504",
+            "--file-type",
+            "y1",
+            "--data-file",
+            str(data),
+            "--has-header",
+        ]
+    )
+    assert exit_code == 0
+
+    result = verify_directory(target / "_manifest.json", has_header=True)
+
+    assert result.ok
+
+
+def test_verify_directory_stops_at_size_check(tmp_path: Path) -> None:
+    target = _prepare(tmp_path)
+    (target / "131000123_202504_y1_001.csv").write_text("col\n1\n2\n3\n", encoding="utf-8")
+
+    result = verify_directory(target / "_manifest.json", has_header=True)
+
+    assert result.status == "mismatch"
+    assert result.check == "files"
+
+
+def test_verify_directory_detects_hash_mismatch(tmp_path: Path) -> None:
+    target = _prepare(tmp_path)
+    (target / "131000123_202504_y1_001.csv").write_text("col\n1\n3\n", encoding="utf-8")
+
+    result = verify_directory(target / "_manifest.json", has_header=True)
+
+    assert result.check == "hash"
+
+
+def test_verify_tree_and_report(tmp_path: Path) -> None:
+    _prepare(tmp_path)
+    broken = tmp_path / "raw" / "yyyymm=2025-04" / "y3"
+    broken.mkdir()
+    (broken / "_manifest.json").write_text("{}", encoding="utf-8")
+    report = tmp_path / "report.json"
+
+    results = verify_tree(tmp_path / "raw", has_header=True, workers=2)
+    exit_code = main([str(tmp_path / "raw"), "--has-header", "--report", str(report)])
+
+    assert [result.status for result in results] == ["ok", "mismatch"]
+    assert exit_code == 1
+    payload = json.loads(report.read_text(encoding="utf-8"))
+    assert payload["total"] == 2
+    assert payload["failed"] == 1
+    assert payload["results"][1]["check"] == "schema"
+
+
+def test_verify_tree_reports_corrupt_gzip(tmp_path: Path) -> None:
+    target = tmp_path / "raw" / "yyyymm=2025-04" / "y1"
+    target.mkdir(parents=True)
+    data = target / "131000123_202504_y1_001.gz"
+    data.write_bytes(gzip.compress(b"col\n1\n2\n"))
+    exit_code = generate_main(
+        [
+            str(target),
+            "--facility",
+            "131000123",
+            "--yyyymm",
+            "202504",
+            "--file-type",
+            "y1",
+            "--data-file",
+            str(data),
+            "--has-header",
+        ]
+    )
+    assert exit_code == 0
+    payload = bytearray(data.read_bytes())
+    payload[12:16] = b"\xff\xff\xff\xff"
+    data.write_bytes(bytes(payload))
+
+    results = verify_tree(tmp_path / "raw", has_header=True)
+
+    assert [result.status for result in results] == ["error"]
+    assert "Cannot decompress" in results[0].message
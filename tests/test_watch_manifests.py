@@ -0,0 +1,151 @@
+"""Tests for tools.watch_manifests utilities."""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tools.watch_manifests as watch_manifests
+from tools.verify_manifest import verify_directory
+from tools.watch_manifests import ManifestWatcher, parse_data_file_name
+
+
+def _watcher(root: Path, column_stats: bool = False) -> ManifestWatcher:
+    return ManifestWatcher(
+        root,
+        has_header=True,
+        settle_seconds=0,
+        poll_interval=0,
+        use_inotify=False,
+        column_stats=column_stats,
+    )
+
+
+def test_parse_data_file_name() -> None:
+    assert parse_data_file_name("131000123_202504_ef_in_001.csv") == {
+        "facility": "131000123",
+        "yyyymm": "202504",
+        "file_type": "ef_in",
+        "seq": "001",
+    }
+    assert parse_data_file_name("_manifest.json") is None
+
+
+def test_watcher_appends_files_without_rereading(tmp_path: Path, monkeypatch) -> None:
+    target = tmp_path / "raw" / "yyyymm=2025-04" / "y1"
+    target.mkdir(parents=True)
+    first = target / "131000123_202504_y1_001.csv"
+    first.write_text("facility_cd,admission_date\n131000123,2025-04-02\n131000123,\n", encoding="utf-8")
+
+    scanned = []
+    original_scan = watch_manifests.scan_data_file
+
+    def tracking_scan(path, *args, **kwargs):
+        scanned.append(path.name)
+        return original_scan(path, *args, **kwargs)
+
+    monkeypatch.setattr(watch_manifests, "scan_data_file", tracking_scan)
+    watcher = _watcher(tmp_path / "raw", column_stats=True)
+    try:
+        watcher.run_once()
+        second = target / "131000123_202504_y1_002.csv"
+        second.write_text("facility_cd,admission_date\n131000456,2025-04-05\n", encoding="utf-8")
+        watcher.poll()
+        watcher.drain()
+    finally:
+        watcher.close()
+
+    assert scanned == [first.name, second.name]
+    manifest = json.loads((target / "_manifest.json").read_text(encoding="utf-8"))
+    assert manifest["records"] == 3
+    assert manifest["column_stats"]["distinct"] == {"facility_cd": ["131000123", "131000456"]}
+    assert manifest["column_stats"]["null_counts"] == {"facility_cd": 0, "admission_date": 1}
+    assert manifest["hash"]["value"] == hashlib.sha256(first.read_bytes() + second.read_bytes()).hexdigest()
+    assert verify_directory(target / "_manifest.json", has_header=True).ok
+    assert not (target / "_manifest.json.tmp").exists()
+
+
+def test_watcher_rescans_modified_file(tmp_path: Path) -> None:
+    target = tmp_path / "raw" / "yyyymm=2025-04" / "y1"
+    target.mkdir(parents=True)
+    data = target / "131000123_202504_y1_001.csv"
+    data.write_text("col\n1\n", encoding="utf-8")
+
+    watcher = _watcher(tmp_path / "raw")
+    try:
+        watcher.run_once()
+        data.write_text("col\n1\n2\n3\n", encoding="utf-8")
+        watcher.run_once()
+    finally:
+        watcher.close()
+
+    manifest = json.loads((target / "_manifest.json").read_text(encoding="utf-8"))
+    assert manifest["records"] == 3
+    assert verify_directory(target / "_manifest.json", has_header=True).ok
+
+
+def test_watcher_rescan_skips_unsettled_files(tmp_path: Path) -> None:
+    target = tmp_path / "raw" / "yyyymm=2025-04" / "y1"
+    target.mkdir(parents=True)
+    (target / "131000123_202504_y1_002.csv").write_text("col\n1\n2\n", encoding="utf-8")
+    watcher = ManifestWatcher(
+        tmp_path / "raw", has_header=True, settle_seconds=0.2, poll_interval=0, use_inotify=False
+    )
+    try:
+        watcher.run_once()
+        (target / "131000123_202504_y1_001.csv").write_text("col\n1\n", encoding="utf-8")
+        partial = target / "131000123_202504_y1_003.csv"
+        partial.write_text("col\n1\n", encoding="utf-8")
+        watcher.poll()
+        time.sleep(0.3)
+        with partial.open("a", encoding="utf-8") as fh:
+            fh.write("2\n3\n")
+        # 001 has settled, 003 is still growing: the out-of-order 001 forces a
+        # rescan which must not pick up 003.
+        watcher.poll()
+        watcher.drain()
+        manifest = json.loads((target / "_manifest.json").read_text(encoding="utf-8"))
+        assert manifest["records"] == 3
+
+        time.sleep(0.3)
+        watcher.poll()
+        watcher.drain()
+    finally:
+        watcher.close()
+
+    manifest = json.loads((target / "_manifest.json").read_text(encoding="utf-8"))
+    assert manifest["records"] == 6
+    assert verify_directory(target / "_manifest.json", has_header=True).ok
+
+
+def test_watcher_keeps_manifest_while_a_file_fails(tmp_path: Path) -> None:
+    target = tmp_path / "raw" / "yyyymm=2025-04" / "y1"
+    target.mkdir(parents=True)
+    (target / "131000123_202504_y1_001.csv").write_text("col\n1\n", encoding="utf-8")
+    manifest_path = target / "_manifest.json"
+
+    watcher = _watcher(tmp_path / "raw")
+    try:
+        watcher.run_once()
+        published = manifest_path.read_text(encoding="utf-8")
+        broken = target / "131000123_202504_y1_002.gz"
+        broken.write_bytes(gzip.compress(b"col\n2\n" * 50)[:-12])
+        (target / "131000123_202504_y1_003.csv").write_text("col\n3\n", encoding="utf-8")
+        watcher.run_once()
+        assert manifest_path.read_text(encoding="utf-8") == published
+
+        broken.write_bytes(gzip.compress(b"col\n2\n"))
+        watcher.run_once()
+    finally:
+        watcher.close()
+
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    assert manifest["records"] == 3
+    assert verify_directory(manifest_path, has_header=True).ok
@@ -1,3 +1,10 @@
 """Helper scripts for manual ingestion workflows."""
 
-__all__ = ["generate_manifest", "prepare_upload"]
+__all__ = [
+    "export_parquet",
+    "generate_manifest",
+    "prepare_upload",
+    "profile_dbt_runs",
+    "verify_manifest",
+    "watch_manifests",
+]
@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+"""Export mart datasets to partitioned Parquet files under `processed/`.
+
+A local counterpart of the ``export_parquet`` Lambda described in
+docs/13_data_export.md.  Instead of ``UNLOAD ... PARTITION BY (facility_cd)``
+the rows are streamed in batches, either from the Redshift Data API or from a
+local CSV stand-in, and written with controlled sizes:
+
+* every output file is split into row groups of ``--row-group-rows`` rows
+  and holds at most ``--max-file-rows`` rows;
+* a facility that reaches one full row group gets its own files
+  (``facility_<facility_cd>_part-NNNNN.parquet``);
+* smaller facilities are coalesced, in ``facility_cd`` order, into shared
+  files (``shared_part-NNNNN.parquet``) instead of one tiny file each.
+
+Rows are expected in ``facility_cd`` order, as every query in ``DATASETS``
+returns them.  When the partition value changes, the previous facility is
+complete: its last rows are written to its own files, or moved to the shared
+buffer, whose full row groups are written right away.  Unordered input is
+still exported correctly but may spread a facility over more files.
+
+Files are written in parallel on a thread pool; every shared file has its
+own write chain, so shared files are written concurrently too.  When all of them are
+closed, ``_files.json`` lists every file with its row count and facility
+codes, and ``_SUCCESS`` is created last, so readers can prune by facility
+and month (``processed/yyyymm=<YYYY-MM>/<dataset>/``) without opening files.
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import csv
+import dataclasses
+import decimal
+import json
+import logging
+import os
+import pathlib
+import sys
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+LOGGER = logging.getLogger(__name__)
+
+SUCCESS_MARKER = "_SUCCESS"
+FILE_LISTING = "_files.json"
+
+Row = Tuple[Any, ...]
+
+
+@dataclasses.dataclass
+class DatasetSpec:
+    """Mart query and Parquet schema for one exported dataset."""
+
+    name: str
+    sql: str
+    schema: pa.Schema
+
+
+@dataclasses.dataclass
+class ExportedFile:
+    """Entry of the ``_files.json`` listing."""
+
+    path: str
+    rows: int
+    bytes: int
+    row_groups: int
+    facilities: List[str]
+
+
+# Column types follow ddl/core/mart_tables.sql.
+DATASETS: Dict[str, DatasetSpec] = {
+    "case_summary": DatasetSpec(
+        name="case_summary",
+        sql=(
+            "SELECT facility_cd, data_id, dpc_code, length_of_stay, total_points, readmit_30d_flag, acuity_avg "
+            "FROM mart.fact_case_summary "
+            "WHERE discharge_date >= TO_DATE(:yyyymm, 'YYYYMM') "
+            "AND discharge_date < DATEADD(month, 1, TO_DATE(:yyyymm, 'YYYYMM')) "
+            "ORDER BY facility_cd, data_id"
+        ),
+        schema=pa.schema(
+            [
+                ("facility_cd", pa.string()),
+                ("data_id", pa.string()),
+                ("dpc_code", pa.string()),
+                ("length_of_stay", pa.int32()),
+                ("total_points", pa.int32()),
+                ("readmit_30d_flag", pa.bool_()),
+                ("acuity_avg", pa.decimal128(6, 3)),
+            ]
+        ),
+    ),
+    "cost_monthly": DatasetSpec(
+        name="cost_monthly",
+        sql=(
+            "SELECT facility_cd, year_month, inpatient_points, outpatient_points, inclusive_points, total_points "
+            "FROM mart.fact_cost_monthly WHERE year_month = :yyyymm ORDER BY facility_cd"
+        ),
+        schema=pa.schema(
+            [
+                ("facility_cd", pa.string()),
+                ("year_month", pa.string()),
+                ("inpatient_points", pa.int32()),
+                ("outpatient_points", pa.int32()),
+                ("inclusive_points", pa.int32()),
+                ("total_points", pa.int32()),
+            ]
+        ),
+    ),
+    "dx_outcome": DatasetSpec(
+        name="dx_outcome",
+        sql=(
+            "SELECT facility_cd, year_month, dpc_code, cases, avg_los, mortality_rate, readmit_30d_rate "
+            "FROM mart.fact_dx_outcome WHERE year_month = :yyyymm ORDER BY facility_cd, dpc_code"
+        ),
+        schema=pa.schema(
+            [
+                ("facility_cd", pa.string()),
+                ("year_month", pa.string()),
+                ("dpc_code", pa.string()),
+                ("cases", pa.int32()),
+                ("avg_los", pa.decimal128(6, 2)),
+                ("mortality_rate", pa.decimal128(5, 2)),
+                ("readmit_30d_rate", pa.decimal128(5, 2)),
+            ]
+        ),
+    ),
+}
+
+
+def _converter(data_type: pa.DataType) -> Callable[[Any], Any]:
+    """Return a function that converts Data API / CSV values to ``data_type``."""
+
+    def nullable(func: Callable[[Any], Any]) -> Callable[[Any], Any]:
+        return lambda value: None if value is None or value == "" else func(value)
+
+    if pa.types.is_integer(data_type):
+        return nullable(int)
+    if pa.types.is_boolean(data_type):
+        return nullable(
+            lambda value: value if isinstance(value, bool) else str(value).lower() in {"t", "true", "1"}
+        )
+    if pa.types.is_decimal(data_type):
+        return nullable(lambda value: decimal.Decimal(str(value)))
+    return nullable(str)
+
+
+def iter_csv_rows(path: pathlib.Path) -> Iterator[Dict[str, Any]]:
+    """Yield rows of a headered CSV file, the local stand-in for the Data API."""
+
+    with path.open("r", encoding="utf-8", newline="") as fh:
+        yield from csv.DictReader(fh)
+
+
+def iter_batches(rows: Iterable[Dict[str, Any]], batch_rows: int) -> Iterator[List[Dict[str, Any]]]:
+    batch: List[Dict[str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_rows:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _FileSeries:
+    """Sequence of size-capped Parquet files sharing one name prefix.
+
+    All calls for one series run on the exporter's thread pool but are
+    chained, so only one thread touches a series at a time.
+    """
+
+    def __init__(self, exporter: "ParquetExporter", prefix: str, first_part: int = 0) -> None:
+        self._exporter = exporter
+        self._prefix = prefix
+        self._writer: Optional[pq.ParquetWriter] = None
+        self._path: Optional[pathlib.Path] = None
+        self._rows = 0
+        self._row_groups = 0
+        self._facilities: set = set()
+        self._part = first_part
+        self.files: List[ExportedFile] = []
+
+    def write(self, table: pa.Table, facilities: Iterable[str]) -> None:
+        if self._writer is not None and self._rows + table.num_rows > self._exporter.max_file_rows:
+            self.close()
+        if self._writer is None:
+            self._path = self._exporter.dataset_dir / f"{self._prefix}part-{self._part:05d}.parquet"
+            self._part += 1
+            self._writer = pq.ParquetWriter(
+                self._path, self._exporter.dataset.schema, compression=self._exporter.compression
+            )
+        self._writer.write_table(table, row_group_size=self._exporter.row_group_rows)
+        self._rows += table.num_rows
+        self._row_groups += -(-table.num_rows // self._exporter.row_group_rows)
+        self._facilities.update(facilities)
+
+    def close(self) -> None:
+        if self._writer is None:
+            return
+        self._writer.close()
+        self.files.append(
+            ExportedFile(
+                path=self._path.name,
+                rows=self._rows,
+                bytes=self._path.stat().st_size,
+                row_groups=self._row_groups,
+                facilities=sorted(self._facilities),
+            )
+        )
+        self._writer = None
+        self._rows = 0
+        self._row_groups = 0
+        self._facilities = set()
+
+
+class ParquetExporter:
+    """Stream rows of one dataset into facility-partitioned Parquet files."""
+
+    def __init__(
+        self,
+        dataset: DatasetSpec,
+        dataset_dir: pathlib.Path,
+        row_group_rows: int = 100_000,
+        max_file_rows: int = 1_000_000,
+        workers: int = 4,
+        compression: str = "zstd",
+        partition_column: str = "facility_cd",
+    ) -> None:
+        if row_group_rows <= 0 or max_file_rows < row_group_rows:
+            raise ValueError("max_file_rows must be greater than or equal to row_group_rows (> 0).")
+        self.dataset = dataset
+        self.dataset_dir = dataset_dir
+        self.row_group_rows = row_group_rows
+        self.max_file_rows = max_file_rows
+        self.compression = compression
+        self._partition_index = dataset.schema.names.index(partition_column)
+        self._converters = [_converter(field.type) for field in dataset.schema]
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers))
+        self._tails: Dict[str, concurrent.futures.Future] = {}
+        self._futures: List[concurrent.futures.Future] = []
+        self._current: Optional[str] = None
+        self._buffer: List[Row] = []
+        self._series: Dict[str, _FileSeries] = {}
+        self._shared_rows: List[Row] = []
+        self._shared_series: List[Tuple[str, _FileSeries]] = []
+        self._shared_file_rows = 0
+
+    def _to_table(self, rows: Sequence[Row]) -> pa.Table:
+        columns = list(zip(*rows))
+        arrays = [
+            pa.array(values, type=field.type) for field, values in zip(self.dataset.schema, columns)
+        ]
+        return pa.Table.from_arrays(arrays, schema=self.dataset.schema)
+
+    def _submit(self, key: str, func: Callable[..., None], *args: Any) -> None:
+        """Run ``func`` on the pool after the previous task for ``key`` has finished."""
+
+        previous = self._tails.get(key)
+
+        def task() -> None:
+            if previous is not None:
+                previous.result()
+            func(*args)
+
+        future = self._executor.submit(task)
+        self._tails[key] = future
+        self._futures.append(future)
+
+    def _write_rows(self, series: _FileSeries, rows: List[Row]) -> None:
+        facilities = {row[self._partition_index] for row in rows}
+        series.write(self._to_table(rows), facilities)
+
+    def _flush_row_group(self, facility_cd: str) -> None:
+        series = self._series.get(facility_cd)
+        if series is None:
+            series = self._series[facility_cd] = _FileSeries(self, f"facility_{facility_cd}_")
+        self._submit(facility_cd, self._write_rows, series, self._buffer)
+        self._buffer = []
+
+    def _finish_facility(self, facility_cd: str) -> None:
+        """Write the last rows of a facility whose rows have all arrived."""
+
+        rows, self._buffer = self._buffer, []
+        series = self._series.get(facility_cd)
+        if series is None:
+            self._shared_rows.extend(rows)
+            self._flush_shared(final=False)
+            return
+        if rows:
+            self._submit(facility_cd, self._write_rows, series, rows)
+        self._submit(facility_cd, series.close)
+
+    def _flush_shared(self, final: bool) -> None:
+        """Write full shared row groups (and the remainder when ``final``).
+
+        Each shared file is its own series with its own write chain, started
+        once the previous one holds ``max_file_rows`` rows.
+        """
+
+        while len(self._shared_rows) >= self.row_group_rows or (final and self._shared_rows):
+            rows = self._shared_rows[: self.row_group_rows]
+            self._shared_rows = self._shared_rows[self.row_group_rows :]
+            if not self._shared_series or self._shared_file_rows + len(rows) > self.max_file_rows:
+                if self._shared_series:
+                    key, series = self._shared_series[-1]
+                    self._submit(key, series.close)
+                index = len(self._shared_series)
+                self._shared_series.append(
+                    (f"__shared_{index}__", _FileSeries(self, "shared_", first_part=index))
+                )
+                self._shared_file_rows = 0
+            key, series = self._shared_series[-1]
+            self._submit(key, self._write_rows, series, rows)
+            self._shared_file_rows += len(rows)
+
+    def add_batch(self, rows: Iterable[Dict[str, Any]]) -> None:
+        names = self.dataset.schema.names
+        for row in rows:
+            converted = tuple(convert(row.get(name)) for name, convert in zip(names, self._converters))
+            facility_cd = converted[self._partition_index] or ""
+            if facility_cd != self._current:
+                if self._current is not None:
+                    self._finish_facility(self._current)
+                self._current = facility_cd
+            self._buffer.append(converted)
+            if len(self._buffer) >= self.row_group_rows:
+                self._flush_row_group(facility_cd)
+
+    def finish(self) -> List[ExportedFile]:
+        """Flush the last facility and the shared remainder, then wait for all writes."""
+
+        if self._current is not None:
+            self._finish_facility(self._current)
+            self._current = None
+        self._flush_shared(final=True)
+
+        all_series = [*self._series.items(), *self._shared_series]
+        for key, series in all_series:
+            self._submit(key, series.close)
+        try:
+            for future in concurrent.futures.as_completed(self._futures):
+                future.result()
+        finally:
+            self._executor.shutdown(wait=True)
+
+        files = [exported for _, series in all_series for exported in series.files]
+        return sorted(files, key=lambda item: item.path)
+
+
+def prepare_dataset_dir(dataset_dir: pathlib.Path) -> None:
+    """Remove the outputs of a previous export so the listing stays authoritative."""
+
+    dataset_dir.mkdir(parents=True, exist_ok=True)
+    for name in (SUCCESS_MARKER, FILE_LISTING):
+        (dataset_dir / name).unlink(missing_ok=True)
+    for path in dataset_dir.glob("*.parquet"):
+        path.unlink()
+
+
+def write_listing(
+    dataset_dir: pathlib.Path, dataset: str, yyyymm: str, files: List[ExportedFile]
+) -> None:
+    listing = {
+        "dataset": dataset,
+        "yyyymm": yyyymm,
+        "total_rows": sum(item.rows for item in files),
+        "files": [dataclasses.asdict(item) for item in files],
+    }
+    (dataset_dir / FILE_LISTING).write_text(
+        json.dumps(listing, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+    )
+    (dataset_dir / SUCCESS_MARKER).write_text("", encoding="utf-8")
+
+
+def export_dataset(
+    rows: Iterable[Dict[str, Any]],
+    dataset: DatasetSpec,
+    output_dir: pathlib.Path,
+    yyyymm: str,
+    batch_rows: int = 10_000,
+    row_group_rows: int = 100_000,
+    max_file_rows: int = 1_000_000,
+    workers: int = 4,
+    compression: str = "zstd",
+) -> List[ExportedFile]:
+    dataset_dir = output_dir / f"yyyymm={yyyymm[:4]}-{yyyymm[4:]}" / dataset.name
+    prepare_dataset_dir(dataset_dir)
+    exporter = ParquetExporter(
+        dataset=dataset,
+        dataset_dir=dataset_dir,
+        row_group_rows=row_group_rows,
+        max_file_rows=max_file_rows,
+        workers=workers,
+        compression=compression,
+    )
+    for batch in iter_batches(rows, batch_rows):
+        exporter.add_batch(batch)
+    files = exporter.finish()
+    write_listing(dataset_dir, dataset.name, yyyymm, files)
+    LOGGER.info(
+        "Exported %d rows of %s into %d files under %s",
+        sum(item.rows for item in files),
+        dataset.name,
+        len(files),
+        dataset_dir,
+    )
+    return files
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--yyyymm", required=True, help="Target month in YYYYMM format")
+    parser.add_argument(
+        "--dataset",
+        action="append",
+        choices=sorted(DATASETS),
+        help="Dataset to export. Repeat for several; defaults to all",
+    )
+    parser.add_argument("--output-dir", type=pathlib.Path, default=pathlib.Path("processed"))
+    parser.add_argument(
+        "--source-csv",
+        type=pathlib.Path,
+        help="Read rows from this headered CSV instead of Redshift (requires a single --dataset)",
+    )
+    parser.add_argument("--workgroup-name", help="Redshift workgroup for the Data API")
+    parser.add_argument("--database", help="Redshift database for the Data API")
+    parser.add_argument("--db-user", help="Database user for the Data API")
+    parser.add_argument("--secret-arn", help="Secrets Manager ARN for credentials")
+    parser.add_argument("--batch-rows", type=int, default=10_000, help="Rows handed to the writer per batch")
+    parser.add_argument("--row-group-rows", type=int, default=100_000, help="Rows per Parquet row group")
+    parser.add_argument("--max-file-rows", type=int, default=1_000_000, help="Maximum rows per Parquet file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Parallel file writers")
+    parser.add_argument("--compression", default="zstd", help="Parquet compression codec")
+    parser.add_argument(
+        "--log-level",
+        default=os.environ.get("LOG_LEVEL", "INFO"),
+        help="Python logging level",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s %(message)s")
+
+    if len(args.yyyymm) != 6 or not args.yyyymm.isdigit():
+        print("Error: yyyymm must be a 6 digit string (YYYYMM).", file=sys.stderr)
+        return 1
+    if args.row_group_rows <= 0 or args.max_file_rows < args.row_group_rows:
+        print("Error: --max-file-rows must be >= --row-group-rows (> 0).", file=sys.stderr)
+        return 1
+
+    datasets = [DATASETS[name] for name in (args.dataset or sorted(DATASETS))]
+    redshift = None
+    if args.source_csv:
+        if len(datasets) != 1:
+            print("Error: --source-csv requires exactly one --dataset.", file=sys.stderr)
+            return 1
+        if not args.source_csv.exists():
+            print(f"Error: source file not found: {args.source_csv}", file=sys.stderr)
+            return 1
+    else:
+        if not (args.workgroup_name and args.database):
+            print("Error: provide --source-csv or --workgroup-name and --database.", file=sys.stderr)
+            return 1
+        try:
+            from tools.run_dbt_dq import RedshiftDataAPI
+        except ImportError:  # executed as ./tools/export_parquet.py
+            from run_dbt_dq import RedshiftDataAPI
+
+        redshift = RedshiftDataAPI(
+            workgroup_name=args.workgroup_name,
+            database=args.database,
+            db_user=args.db_user,
+            secret_arn=args.secret_arn,
+        )
+
+    for dataset in datasets:
+        if redshift is None:
+            rows = iter_csv_rows(args.source_csv)
+        else:
+            rows = redshift.iter_rows(
+                sql=dataset.sql,
+                parameters=[{"name": "yyyymm", "value": {"stringValue": args.yyyymm}}],
+            )
+        export_dataset(
+            rows=rows,
+            dataset=dataset,
+            output_dir=args.output_dir,
+            yyyymm=args.yyyymm,
+            batch_rows=args.batch_rows,
+            row_group_rows=args.row_group_rows,
+            max_file_rows=args.max_file_rows,
+            workers=args.workers,
+            compression=args.compression,
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,15 +3,82 @@
 from __future__ import annotations
 
 import argparse
+import csv
+import dataclasses
 import datetime as dt
+import gzip
 import hashlib
+import io
 import json
+import logging
+import os
 import pathlib
+import queue
 import sys
-from typing import Optional
+import threading
+import zlib
+from typing import Any, BinaryIO, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd input is optional
+    zstandard = None
+
+try:
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.csv
+except ImportError:  # column stats fall back to the csv module
+    pyarrow = None
+
+LOGGER = logging.getLogger(__name__)
 
 FILE_TYPES = {"y1", "y3", "y4", "ef_in", "ef_out", "d", "h", "k"}
 HASH_ALGORITHMS = {"MD5": hashlib.md5, "SHA256": hashlib.sha256}
+COMPRESSION_MAGIC = {"gzip": b"\x1f\x8b", "zstd": b"\x28\xb5\x2f\xfd"}
+DECOMPRESSION_ERRORS: tuple[type[Exception], ...] = (EOFError, zlib.error, gzip.BadGzipFile)
+if zstandard is not None:
+    DECOMPRESSION_ERRORS += (zstandard.ZstdError,)
+CHUNK_SIZE = 1024 * 1024
+# Bytes column stats may buffer while looking for the end of a quoted record.
+MAX_PENDING_BYTES = 4 * CHUNK_SIZE
+
+# Column layout of headerless files. Source: ddl/core/raw_tables.sql
+RAW_COLUMNS = {
+    "y1": [
+        "facility_cd", "data_id", "admission_date", "discharge_date", "sex_code", "birth_date",
+        "age", "dpc_code", "main_icd10", "outcome_code", "emergency_flag", "surgery_flag",
+        "height_cm", "weight_kg",
+    ],
+    "y3": [
+        "facility_cd", "report_year", "facility_name", "bed_function_code", "hospital_group",
+        "pref_code", "city_code",
+    ],
+    "ef_in": [
+        "facility_cd", "data_id", "seq_no", "detail_no", "service_date", "service_code",
+        "unit_code", "qty", "points", "yen_flag", "doctor_code",
+    ],
+    "d": [
+        "facility_cd", "data_id", "segment_no", "dpc_code", "start_date", "end_date",
+        "inclusive_points", "adjust_points", "reason_code",
+    ],
+    "h": ["facility_cd", "data_id", "eval_date", "seq_no", "item_code", "severity_score"],
+    "k": ["facility_cd", "data_id", "common_patient_id", "birth_month", "insurer_no", "subscriber_no"],
+}
+MIN_MAX_COLUMNS = ("admission_date", "discharge_date", "service_date")
+COLUMN_STATS_MODES = ("auto", "always", "never")
+DISTINCT_COLUMNS = ("facility_cd",)
+
+
+@dataclasses.dataclass
+class ScanResult:
+    """Record count and digest gathered in a single read of a data file."""
+
+    records: int
+    hash_value: str
+    compression: Optional[str]
+    uncompressed_bytes: int
+    column_stats: Optional[dict[str, Any]] = None
 
 
 def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
@@ -24,10 +91,24 @@ def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
     parser.add_argument("--yyyymm", required=True, help="Month in YYYYMM format")
     parser.add_argument("--file-type", required=True, choices=sorted(FILE_TYPES))
     parser.add_argument("--records", type=int, help="Number of records in the uploaded file(s)")
-    parser.add_argument("--data-file", type=pathlib.Path, help="Source file used to compute hash/records")
+    parser.add_argument(
+        "--data-file",
+        type=pathlib.Path,
+        help="Source file used to compute hash/records. gzip and zstd files are decompressed on the fly",
+    )
     parser.add_argument("--has-header", action="store_true", help="Treat the first line of --data-file as a header when counting records")
     parser.add_argument("--hash-algorithm", choices=sorted(HASH_ALGORITHMS.keys()), default="SHA256")
     parser.add_argument("--hash-value", help="Explicit hash value. Overrides --data-file hash computation")
+    parser.add_argument(
+        "--column-stats",
+        choices=COLUMN_STATS_MODES,
+        default="auto",
+        help=(
+            "Record per-column statistics (date ranges, facility codes, null counts). "
+            "'auto' collects them when pyarrow is installed; 'always' falls back to the "
+            "much slower csv module without it"
+        ),
+    )
     parser.add_argument("--notes", help="Optional notes field")
     parser.add_argument(
         "--created-at",
@@ -48,6 +129,12 @@ def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
     return parser.parse_args(argv)
 
 
+def column_stats_enabled(mode: str) -> bool:
+    """Resolve a ``--column-stats`` mode; ``auto`` requires the pyarrow parser."""
+
+    return mode == "always" or (mode == "auto" and pyarrow is not None)
+
+
 def validate_facility(facility: str) -> None:
     if len(facility) != 9 or not facility.isdigit():
         raise ValueError("Facility code must be a 9 digit string.")
@@ -59,9 +146,273 @@ def validate_month(yyyymm: str) -> None:
     dt.datetime.strptime(yyyymm, "%Y%m")
 
 
+def detect_compression(data_file: pathlib.Path) -> Optional[str]:
+    """Return the compression codec of ``data_file`` based on its magic bytes."""
+
+    with data_file.open("rb") as fh:
+        head = fh.read(4)
+    for codec, magic in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+def _require_zstandard() -> None:
+    if zstandard is None:
+        raise ValueError("zstd compressed input requires the 'zstandard' package.")
+
+
+def open_data_file(data_file: pathlib.Path) -> BinaryIO:
+    """Open ``data_file`` for reading its decompressed bytes."""
+
+    codec = detect_compression(data_file)
+    if codec == "gzip":
+        return gzip.open(data_file, "rb")
+    if codec == "zstd":
+        _require_zstandard()
+        return zstandard.ZstdDecompressor().stream_reader(
+            data_file.open("rb"), read_across_frames=True, closefd=True
+        )
+    return data_file.open("rb")
+
+
+def _new_decompressor(codec: str):
+    if codec == "gzip":
+        return zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    _require_zstandard()
+    return zstandard.ZstdDecompressor().decompressobj()
+
+
+class _LineCounter:
+    """Count lines in a byte stream the same way text mode iteration does.
+
+    Like universal newlines, ``\n``, ``\r\n`` and a lone ``\r`` each end a
+    line, including a ``\r\n`` pair split across two chunks.
+    """
+
+    def __init__(self) -> None:
+        self.newlines = 0
+        self.size = 0
+        self._last = b""
+
+    def update(self, chunk: bytes) -> None:
+        if chunk:
+            self.newlines += chunk.count(b"\n")
+            carriage_returns = chunk.count(b"\r")
+            if carriage_returns:
+                self.newlines += carriage_returns - chunk.count(b"\r\n")
+            if self._last == b"\r" and chunk[:1] == b"\n":
+                self.newlines -= 1
+            self.size += len(chunk)
+            self._last = chunk[-1:]
+
+    @property
+    def lines(self) -> int:
+        if self._last and self._last not in (b"\n", b"\r"):
+            return self.newlines + 1
+        return self.newlines
+
+
+def _last_record_end(chunk: bytes, in_quotes: bool) -> tuple[int, bool]:
+    """Find the last newline of ``chunk`` that ends a CSV record.
+
+    ``in_quotes`` is the quote state at the start of ``chunk``.  A newline
+    preceded by an odd number of double quotes lies inside a quoted field;
+    escaped quotes (``""``) keep the parity, so counting is enough.  Newlines
+    are visited from the end and every byte is counted once.  Returns the
+    offset just past that newline (0 when there is none) and the quote state
+    at the end of ``chunk``.
+    """
+
+    total = chunk.count(b'"')
+    after = 0
+    end = len(chunk)
+    cut = chunk.rfind(b"\n")
+    while cut >= 0:
+        after += chunk.count(b'"', cut, end)
+        end = cut
+        if (in_quotes + total - after) % 2 == 0:
+            break
+        cut = chunk.rfind(b"\n", 0, cut)
+    return cut + 1, bool((in_quotes + total) % 2)
+
+
+class _ColumnStats:
+    """Collect min/max, distinct and null counts per column from CSV byte chunks.
+
+    Chunks are buffered up to the last newline outside double quotes, so each
+    block handed to the parser holds complete records and quoted fields may
+    contain line breaks.  With pyarrow installed a block is parsed by
+    ``pyarrow.csv`` and reduced with ``pyarrow.compute`` kernels.  Without it,
+    or when pyarrow rejects a block (ragged rows, invalid UTF-8), the block is
+    parsed row by row with :mod:`csv`, which is far slower.
+
+    An unbalanced quote would otherwise keep every later record buffered;
+    once more than ``MAX_PENDING_BYTES`` are waiting, blocks are cut at plain
+    line breaks for the rest of the file.
+    """
+
+    def __init__(self, columns: Optional[list[str]], has_header: bool, source: str = "") -> None:
+        self._columns: Optional[list[str]] = None
+        self._needs_header = has_header
+        self._source = source
+        self._in_quotes = False
+        self._quote_aware = True
+        self._pending: list[bytes] = []
+        self._pending_bytes = 0
+        self.min_max: dict[str, dict[str, str]] = {}
+        self.distinct: dict[str, set[str]] = {}
+        self.null_counts: dict[str, int] = {}
+        if columns and not has_header:
+            self._set_columns(columns)
+
+    def _set_columns(self, columns: list[str]) -> None:
+        self._columns = columns
+        self.null_counts = {column: 0 for column in columns}
+        self.distinct = {column: set() for column in columns if column in DISTINCT_COLUMNS}
+
+    def update(self, chunk: bytes) -> None:
+        if self._quote_aware:
+            cut, self._in_quotes = _last_record_end(chunk, self._in_quotes)
+        else:
+            cut = max(chunk.rfind(b"\n"), chunk.rfind(b"\r")) + 1
+        if cut == 0:
+            self._pending.append(chunk)
+            self._pending_bytes += len(chunk)
+            if self._quote_aware and self._pending_bytes > MAX_PENDING_BYTES:
+                self._stop_quote_tracking()
+            return
+        self._pending.append(chunk[:cut])
+        block = b"".join(self._pending)
+        self._pending = [chunk[cut:]]
+        self._pending_bytes = len(chunk) - cut
+        self._process(block)
+
+    def _stop_quote_tracking(self) -> None:
+        LOGGER.warning(
+            "%s: no record boundary within %d bytes (unbalanced quote?); "
+            "column_stats fall back to line-based parsing",
+            self._source or "data file",
+            self._pending_bytes,
+        )
+        self._quote_aware = False
+        data = b"".join(self._pending)
+        cut = max(data.rfind(b"\n"), data.rfind(b"\r")) + 1
+        self._pending = [data[cut:]]
+        self._pending_bytes = len(data) - cut
+        if cut:
+            self._process(data[:cut])
+
+    def finish(self) -> None:
+        data = b"".join(self._pending)
+        self._pending = []
+        self._pending_bytes = 0
+        if data:
+            self._process(data)
+
+    def _process(self, block: bytes) -> None:
+        if self._needs_header:
+            end = block.find(b"\n") + 1 or len(block)
+            header = next(csv.reader([block[:end].decode("utf-8", errors="replace")]), None)
+            if header is None:
+                return
+            self._needs_header = False
+            self._set_columns([name.strip().lstrip("\ufeff").lower() for name in header])
+            block = block[end:]
+        if not self._columns or not block.strip():
+            return
+        if pyarrow is not None:
+            try:
+                self._process_arrow(block)
+                return
+            except pyarrow.ArrowInvalid:
+                pass
+        self._process_rows(block)
+
+    def _process_arrow(self, block: bytes) -> None:
+        table = pyarrow.csv.read_csv(
+            pyarrow.BufferReader(block),
+            read_options=pyarrow.csv.ReadOptions(column_names=self._columns),
+            parse_options=pyarrow.csv.ParseOptions(newlines_in_values=True),
+            convert_options=pyarrow.csv.ConvertOptions(
+                column_types={column: pyarrow.string() for column in self._columns},
+                strings_can_be_null=True,
+                null_values=[""],
+            ),
+        )
+        for column, values in zip(self._columns, table.columns):
+            self.null_counts[column] += values.null_count
+            if column in self.distinct:
+                self.distinct[column].update(pyarrow.compute.unique(values).drop_null().to_pylist())
+            if column in MIN_MAX_COLUMNS:
+                bounds = pyarrow.compute.min_max(values).as_py()
+                if bounds["min"] is not None:
+                    self._update_min_max(column, bounds["min"], bounds["max"])
+
+    def _process_rows(self, block: bytes) -> None:
+        rows = csv.reader(io.StringIO(block.decode("utf-8", errors="replace"), newline=""))
+        width = len(self._columns)
+        batch = [
+            row[:width] if len(row) >= width else row + [""] * (width - len(row))
+            for row in rows
+            if row
+        ]
+        if not batch:
+            return
+        for column, values in zip(self._columns, zip(*batch)):
+            self.null_counts[column] += values.count("")
+            if column in self.distinct:
+                self.distinct[column].update(values)
+            if column in MIN_MAX_COLUMNS:
+                present = [value for value in values if value]
+                if present:
+                    self._update_min_max(column, min(present), max(present))
+
+    def _update_min_max(self, column: str, low: str, high: str) -> None:
+        current = self.min_max.get(column)
+        if current is not None:
+            low, high = min(low, current["min"]), max(high, current["max"])
+        self.min_max[column] = {"min": low, "max": high}
+
+    def as_dict(self) -> Optional[dict[str, Any]]:
+        if not self._columns:
+            return None
+        return {
+            "min_max": self.min_max,
+            "distinct": {column: sorted(values - {""}) for column, values in self.distinct.items()},
+            "null_counts": self.null_counts,
+        }
+
+
+def merge_column_stats(stats: list[Optional[dict[str, Any]]]) -> Optional[dict[str, Any]]:
+    """Combine the ``column_stats`` of several files of the same directory."""
+
+    present = [item for item in stats if item]
+    if not present:
+        return None
+    merged: dict[str, Any] = {"min_max": {}, "distinct": {}, "null_counts": {}}
+    for item in present:
+        for column, bounds in item["min_max"].items():
+            current = merged["min_max"].get(column)
+            if current is None:
+                merged["min_max"][column] = dict(bounds)
+            else:
+                current["min"] = min(current["min"], bounds["min"])
+                current["max"] = max(current["max"], bounds["max"])
+        for column, values in item["distinct"].items():
+            merged["distinct"].setdefault(column, set()).update(values)
+        for column, count in item["null_counts"].items():
+            merged["null_counts"][column] = merged["null_counts"].get(column, 0) + count
+    merged["distinct"] = {column: sorted(values) for column, values in merged["distinct"].items()}
+    return merged
+
+
 def detect_records(data_file: pathlib.Path, has_header: bool) -> int:
-    with data_file.open("r", encoding="utf-8") as fh:
-        count = sum(1 for _ in fh)
+    try:
+        with open_data_file(data_file) as raw, io.TextIOWrapper(raw, encoding="utf-8") as fh:
+            count = sum(1 for _ in fh)
+    except DECOMPRESSION_ERRORS as exc:
+        raise ValueError(f"Cannot decompress {data_file}: {exc}") from exc
     if has_header and count > 0:
         count -= 1
     return count
@@ -70,11 +421,135 @@ def detect_records(data_file: pathlib.Path, has_header: bool) -> int:
 def compute_hash(data_file: pathlib.Path, algorithm: str) -> str:
     hash_func = HASH_ALGORITHMS[algorithm]()
     with data_file.open("rb") as fh:
-        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+        for chunk in iter(lambda: fh.read(CHUNK_SIZE), b""):
             hash_func.update(chunk)
     return hash_func.hexdigest()
 
 
+def _stream_worker(
+    codec: Optional[str], chunks: "queue.Queue[Optional[bytes]]", sinks: list[Any], errors: list[Exception]
+) -> None:
+    """Feed ``sinks`` with the chunks read by another thread, decompressing them first if needed."""
+
+    finished = False
+    try:
+        if codec is None:
+            for chunk in iter(chunks.get, None):
+                for sink in sinks:
+                    sink.update(chunk)
+            finished = True
+            return
+        decompressor = _new_decompressor(codec)
+        fed = False
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                finished = True
+                break
+            if codec == "gzip" and not fed:
+                # gzip.open skips zero padding after the last member; do the same.
+                chunk = chunk.lstrip(b"\x00")
+            while chunk:
+                data = decompressor.decompress(chunk)
+                for sink in sinks:
+                    sink.update(data)
+                fed = True
+                if decompressor.eof:
+                    # Concatenated gzip members / zstd frames.
+                    chunk = decompressor.unused_data
+                    decompressor = _new_decompressor(codec)
+                    fed = False
+                    if codec == "gzip":
+                        chunk = chunk.lstrip(b"\x00")
+                else:
+                    chunk = b""
+        if fed and not decompressor.eof:
+            raise ValueError("compressed stream is truncated")
+    except Exception as exc:  # noqa: BLE001 - reported back to the reading thread
+        errors.append(exc)
+        # Keep consuming so that the reading thread never blocks on a full queue.
+        while not finished:
+            finished = chunks.get() is None
+
+
+def scan_data_file(
+    data_file: pathlib.Path,
+    algorithm: str,
+    has_header: bool,
+    hash_func=None,
+    collect_stats: bool = False,
+    columns: Optional[list[str]] = None,
+) -> ScanResult:
+    """Hash the stored bytes and count records of ``data_file`` in one read.
+
+    For compressed input the file is read once on the calling thread, which
+    feeds the digest, while a worker thread decompresses the same chunks and
+    counts lines so that hashing and decompression overlap.  Pass an existing
+    ``hash_func`` to continue a digest over several files.
+
+    With ``collect_stats`` the decompressed stream is also parsed as CSV to
+    gather ``column_stats``, on the worker thread for plain files as well.
+    Column names come from the header line or, for headerless files, from
+    ``columns``.
+    """
+
+    codec = detect_compression(data_file)
+    if hash_func is None:
+        hash_func = HASH_ALGORITHMS[algorithm]()
+    counter = _LineCounter()
+    sinks: list[Any] = [counter]
+    stats: Optional[_ColumnStats] = None
+    if collect_stats:
+        stats = _ColumnStats(columns, has_header, source=str(data_file))
+        sinks.append(stats)
+
+    if codec is None and stats is None:
+        with data_file.open("rb") as fh:
+            for chunk in iter(lambda: fh.read(CHUNK_SIZE), b""):
+                hash_func.update(chunk)
+                counter.update(chunk)
+    else:
+        if codec == "zstd":
+            _require_zstandard()
+        # Plain files only hand the column stats parser to the worker.
+        local_sinks: list[Any] = [counter] if codec is None else []
+        worker_sinks = [stats] if codec is None else sinks
+        chunks: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=8)
+        errors: list[Exception] = []
+        worker = threading.Thread(
+            target=_stream_worker, args=(codec, chunks, worker_sinks, errors), daemon=True
+        )
+        worker.start()
+        try:
+            with data_file.open("rb") as fh:
+                for chunk in iter(lambda: fh.read(CHUNK_SIZE), b""):
+                    hash_func.update(chunk)
+                    for sink in local_sinks:
+                        sink.update(chunk)
+                    chunks.put(chunk)
+        finally:
+            chunks.put(None)
+            worker.join()
+        if errors:
+            if codec is None:
+                raise ValueError(f"Cannot collect column stats from {data_file}: {errors[0]}")
+            raise ValueError(f"Cannot decompress {data_file} as {codec}: {errors[0]}")
+
+    if stats is not None:
+        stats.finish()
+
+    records = counter.lines
+    if has_header and records > 0:
+        records -= 1
+    return ScanResult(
+        records=records,
+        hash_value=hash_func.hexdigest(),
+        compression=codec,
+        uncompressed_bytes=counter.size,
+        column_stats=stats.as_dict() if stats is not None else None,
+    )
+
+
 def evaluate_target_structure(
     target_dir: pathlib.Path, yyyymm: str, file_type: str
 ) -> list[str]:
@@ -98,6 +573,14 @@ def evaluate_target_structure(
     return warnings
 
 
+def write_manifest(manifest_path: pathlib.Path, manifest: dict) -> None:
+    """Write ``manifest`` through a temporary file so readers never see a partial file."""
+
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    tmp_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp_path, manifest_path)
+
+
 def main(argv: Optional[list[str]] = None) -> int:
     args = parse_args(argv)
 
@@ -125,15 +608,36 @@ def main(argv: Optional[list[str]] = None) -> int:
         print(f"Error: {manifest_path} already exists. Use --overwrite to replace it.", file=sys.stderr)
         return 1
 
+    scan: Optional[ScanResult] = None
+    if args.data_file is not None and (args.records is None or not args.hash_value):
+        if not args.data_file.exists():
+            print(f"Error: data file not found: {args.data_file}", file=sys.stderr)
+            return 1
+        collect_stats = column_stats_enabled(args.column_stats)
+        if collect_stats and not args.has_header and args.file_type not in RAW_COLUMNS:
+            print(
+                f"Warning: no column layout for headerless {args.file_type} files; "
+                "column_stats are skipped. Use --has-header if the file has a header line.",
+                file=sys.stderr,
+            )
+        try:
+            scan = scan_data_file(
+                args.data_file,
+                args.hash_algorithm,
+                args.has_header,
+                collect_stats=collect_stats,
+                columns=RAW_COLUMNS.get(args.file_type),
+            )
+        except ValueError as exc:
+            print(f"Error: {exc}", file=sys.stderr)
+            return 1
+
     records = args.records
     if records is None:
-        if args.data_file is None:
+        if scan is None:
             print("Error: --records or --data-file must be provided.", file=sys.stderr)
             return 1
-        if not args.data_file.exists():
-            print(f"Error: data file not found: {args.data_file}", file=sys.stderr)
-            return 1
-        records = detect_records(args.data_file, args.has_header)
+        records = scan.records
 
     if records < 0:
         print("Error: records must be non-negative.", file=sys.stderr)
@@ -142,13 +646,10 @@ def main(argv: Optional[list[str]] = None) -> int:
     if args.hash_value:
         hash_value = args.hash_value
     else:
-        if args.data_file is None:
+        if scan is None:
             print("Error: provide --hash-value or --data-file to compute hash.", file=sys.stderr)
             return 1
-        if not args.data_file.exists():
-            print(f"Error: data file not found: {args.data_file}", file=sys.stderr)
-            return 1
-        hash_value = compute_hash(args.data_file, args.hash_algorithm)
+        hash_value = scan.hash_value
 
     created_at = args.created_at
     if created_at is None:
@@ -166,10 +667,18 @@ def main(argv: Optional[list[str]] = None) -> int:
         "created_at": created_at,
     }
 
+    if args.data_file is not None and args.data_file.exists():
+        manifest["bytes"] = args.data_file.stat().st_size
+    if scan is not None and scan.compression:
+        manifest["compression"] = scan.compression
+        manifest["uncompressed_bytes"] = scan.uncompressed_bytes
+    if scan is not None and scan.column_stats:
+        manifest["column_stats"] = scan.column_stats
+
     if args.notes:
         manifest["notes"] = args.notes
 
-    manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    write_manifest(manifest_path, manifest)
     print(f"Manifest written to {manifest_path}")
     return 0
 
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""Record per-node dbt timings and flag runtime regressions.
+
+Run this after each dbt invocation (``dbt run --select stage``,
+``dbt run --select mart``, ``dbt test``).  It reads ``run_results.json``
+(and ``manifest.json`` when available) from the dbt target directory,
+extracts ``execution_time`` plus the ``compile``/``execute`` phases recorded
+in ``timing`` for every node, and appends them to a local JSON Lines store.
+The store is the time series used to build a rolling baseline: a node is
+flagged when its runtime exceeds ``--threshold`` times the median of its last
+``--window`` successful runs.  This catches incremental models such as
+``stg_y1_case`` that silently fall back to a full scan.
+
+When ``--workgroup-name`` and ``--database`` are given, the timings are also
+inserted into ``dq.dbt_node_timings`` through the Redshift Data API.
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import datetime as dt
+import json
+import logging
+import os
+import pathlib
+import statistics
+import sys
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+SUCCESS_STATUSES = {"success", "pass"}
+
+
+@dataclasses.dataclass
+class NodeTiming:
+    """Timing of a single dbt node in a single invocation."""
+
+    invocation_id: str
+    generated_at: str
+    command: str
+    unique_id: str
+    resource_type: str
+    materialized: Optional[str]
+    status: str
+    execution_time: float
+    compile_time: Optional[float]
+    execute_time: Optional[float]
+    rows_affected: Optional[int]
+    yyyymm: Optional[str] = None
+
+
+@dataclasses.dataclass
+class Regression:
+    """Node whose runtime exceeded its rolling baseline."""
+
+    unique_id: str
+    execution_time: float
+    baseline: float
+    ratio: float
+    samples: int
+
+
+def load_json(path: pathlib.Path) -> Dict[str, Any]:
+    if not path.exists():
+        raise FileNotFoundError(f"Artifact not found: {path}")
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _phase_seconds(timing: List[Dict[str, Any]], name: str) -> Optional[float]:
+    for phase in timing:
+        if phase.get("name") != name:
+            continue
+        started_at = phase.get("started_at")
+        completed_at = phase.get("completed_at")
+        if not started_at or not completed_at:
+            return None
+        started = dt.datetime.fromisoformat(started_at.replace("Z", "+00:00"))
+        completed = dt.datetime.fromisoformat(completed_at.replace("Z", "+00:00"))
+        return (completed - started).total_seconds()
+    return None
+
+
+def extract_node_timings(
+    run_results: Dict[str, Any],
+    manifest: Optional[Dict[str, Any]] = None,
+    yyyymm: Optional[str] = None,
+) -> List[NodeTiming]:
+    metadata = run_results.get("metadata", {})
+    invocation_id = metadata.get("invocation_id", "")
+    generated_at = metadata.get("generated_at", "")
+    command = run_results.get("args", {}).get("which", "unknown")
+    nodes = (manifest or {}).get("nodes", {})
+
+    timings: List[NodeTiming] = []
+    for result in run_results.get("results", []):
+        unique_id = result.get("unique_id")
+        if not unique_id:
+            continue
+        node = nodes.get(unique_id, {})
+        timing = result.get("timing") or []
+        adapter_response = result.get("adapter_response") or {}
+        rows_affected = adapter_response.get("rows_affected")
+        timings.append(
+            NodeTiming(
+                invocation_id=invocation_id,
+                generated_at=generated_at,
+                command=command,
+                unique_id=unique_id,
+                resource_type=node.get("resource_type", unique_id.split(".", 1)[0]),
+                materialized=node.get("config", {}).get("materialized"),
+                status=str(result.get("status")),
+                execution_time=float(result.get("execution_time") or 0.0),
+                compile_time=_phase_seconds(timing, "compile"),
+                execute_time=_phase_seconds(timing, "execute"),
+                rows_affected=int(rows_affected) if rows_affected is not None else None,
+                yyyymm=yyyymm,
+            )
+        )
+    return timings
+
+
+def load_history(store_path: pathlib.Path) -> List[NodeTiming]:
+    if not store_path.exists():
+        return []
+    history: List[NodeTiming] = []
+    with store_path.open("r", encoding="utf-8") as fh:
+        for line_no, line in enumerate(fh, start=1):
+            if not line.strip():
+                continue
+            try:
+                history.append(NodeTiming(**json.loads(line)))
+            except (TypeError, ValueError) as exc:
+                LOGGER.warning("Skipping malformed line %d of %s: %s", line_no, store_path, exc)
+    return history
+
+
+def append_timings(store_path: pathlib.Path, timings: Iterable[NodeTiming]) -> None:
+    store_path.parent.mkdir(parents=True, exist_ok=True)
+    with store_path.open("a", encoding="utf-8") as fh:
+        for timing in timings:
+            fh.write(json.dumps(dataclasses.asdict(timing), ensure_ascii=False) + "\n")
+
+
+def detect_regressions(
+    timings: Iterable[NodeTiming],
+    history: Iterable[NodeTiming],
+    window: int = 10,
+    min_history: int = 3,
+    threshold: float = 2.0,
+    min_seconds: float = 5.0,
+) -> List[Regression]:
+    """Compare ``timings`` against the median of each node's last ``window`` runs.
+
+    A node is reported when it is slower than ``threshold`` times its baseline
+    and by at least ``min_seconds``, so that sub-second jitter is ignored.
+    """
+
+    previous: Dict[str, List[float]] = defaultdict(list)
+    for timing in sorted(history, key=lambda item: item.generated_at):
+        if timing.status in SUCCESS_STATUSES:
+            previous[timing.unique_id].append(timing.execution_time)
+
+    regressions: List[Regression] = []
+    for timing in timings:
+        if timing.status not in SUCCESS_STATUSES:
+            continue
+        samples = previous.get(timing.unique_id, [])[-window:]
+        if len(samples) < min_history:
+            continue
+        baseline = statistics.median(samples)
+        if timing.execution_time - baseline < min_seconds:
+            continue
+        ratio = timing.execution_time / baseline if baseline > 0 else float("inf")
+        if ratio >= threshold:
+            regressions.append(
+                Regression(
+                    unique_id=timing.unique_id,
+                    execution_time=timing.execution_time,
+                    baseline=baseline,
+                    ratio=ratio,
+                    samples=len(samples),
+                )
+            )
+    return regressions
+
+
+TIMING_COLUMNS = (
+    "invocation_id",
+    "generated_at",
+    "command",
+    "unique_id",
+    "resource_type",
+    "materialized",
+    "status",
+    "execution_time",
+    "compile_time",
+    "execute_time",
+    "rows_affected",
+    "yyyymm",
+)
+
+
+def _timing_parameters(timing: NodeTiming, index: int) -> List[Dict[str, Any]]:
+    def _string(value: Optional[str]) -> Dict[str, Any]:
+        return {"stringValue": value} if value is not None else {"isNull": True}
+
+    def _double(value: Optional[float]) -> Dict[str, Any]:
+        return {"doubleValue": value} if value is not None else {"isNull": True}
+
+    def _long(value: Optional[int]) -> Dict[str, Any]:
+        return {"longValue": value} if value is not None else {"isNull": True}
+
+    values = {
+        "invocation_id": _string(timing.invocation_id),
+        "generated_at": _string(timing.generated_at),
+        "command": _string(timing.command),
+        "unique_id": _string(timing.unique_id),
+        "resource_type": _string(timing.resource_type),
+        "materialized": _string(timing.materialized),
+        "status": _string(timing.status),
+        "execution_time": _double(timing.execution_time),
+        "compile_time": _double(timing.compile_time),
+        "execute_time": _double(timing.execute_time),
+        "rows_affected": _long(timing.rows_affected),
+        "yyyymm": _string(timing.yyyymm),
+    }
+    return [{"name": f"{column}_{index}", "value": values[column]} for column in TIMING_COLUMNS]
+
+
+def persist_timings(
+    redshift: Any, timings: Iterable[NodeTiming], table: str, batch_size: int = 100
+) -> None:
+    """Insert ``timings`` with one multi-row INSERT per ``batch_size`` nodes.
+
+    Each Data API statement is polled until it finishes, so batching keeps a
+    large project from paying that round trip once per node.
+    """
+
+    timings = list(timings)
+    for start in range(0, len(timings), batch_size):
+        batch = timings[start : start + batch_size]
+        rows = []
+        params: List[Dict[str, Any]] = []
+        for index, timing in enumerate(batch):
+            placeholders = [f":{column}_{index}" for column in TIMING_COLUMNS]
+            placeholders[1] = f"CAST({placeholders[1]} AS TIMESTAMPTZ)"
+            rows.append("(" + ", ".join(placeholders) + ")")
+            params.extend(_timing_parameters(timing, index))
+        redshift.execute(
+            sql=f"INSERT INTO {table} ({', '.join(TIMING_COLUMNS)}) VALUES " + ", ".join(rows),
+            parameters=params,
+        )
+
+
+def record_run(
+    run_results: Dict[str, Any],
+    manifest: Optional[Dict[str, Any]],
+    store_path: pathlib.Path,
+    yyyymm: Optional[str] = None,
+    window: int = 10,
+    min_history: int = 3,
+    threshold: float = 2.0,
+    min_seconds: float = 5.0,
+) -> tuple[List[NodeTiming], List[Regression]]:
+    """Extract timings, compare them with the stored history and append them."""
+
+    timings = extract_node_timings(run_results, manifest, yyyymm)
+    history = [
+        timing
+        for timing in load_history(store_path)
+        if timing.invocation_id != run_results.get("metadata", {}).get("invocation_id")
+    ]
+    regressions = detect_regressions(
+        timings,
+        history,
+        window=window,
+        min_history=min_history,
+        threshold=threshold,
+        min_seconds=min_seconds,
+    )
+    append_timings(store_path, timings)
+    for regression in regressions:
+        LOGGER.warning(
+            "Runtime regression for %s: %.1fs vs baseline %.1fs (x%.1f over %d runs)",
+            regression.unique_id,
+            regression.execution_time,
+            regression.baseline,
+            regression.ratio,
+            regression.samples,
+        )
+    return timings, regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--project-dir", type=pathlib.Path, default=pathlib.Path("."))
+    parser.add_argument("--target-path", type=pathlib.Path, default=pathlib.Path("target"))
+    parser.add_argument(
+        "--store",
+        type=pathlib.Path,
+        default=pathlib.Path("logs/dbt_node_timings.jsonl"),
+        help="Local JSON Lines time series of node timings",
+    )
+    parser.add_argument("--yyyymm", help="Target year-month processed by the run")
+    parser.add_argument("--window", type=int, default=10, help="Number of previous runs in the baseline")
+    parser.add_argument("--min-history", type=int, default=3, help="Runs required before flagging")
+    parser.add_argument("--threshold", type=float, default=2.0, help="Runtime / baseline ratio to flag")
+    parser.add_argument(
+        "--min-seconds",
+        type=float,
+        default=5.0,
+        help="Minimum absolute slowdown in seconds to flag",
+    )
+    parser.add_argument(
+        "--fail-on-regression",
+        action="store_true",
+        help="Exit with status 1 when a regression is detected",
+    )
+    parser.add_argument("--workgroup-name", help="Redshift workgroup for the optional timings table")
+    parser.add_argument("--database", help="Redshift database for the optional timings table")
+    parser.add_argument("--db-user", help="Database user for the Data API")
+    parser.add_argument("--secret-arn", help="Secrets Manager ARN for credentials")
+    parser.add_argument("--timings-table", default="dq.dbt_node_timings")
+    parser.add_argument(
+        "--log-level",
+        default=os.environ.get("LOG_LEVEL", "INFO"),
+        help="Python logging level",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s %(message)s")
+
+    target_dir = args.project_dir / args.target_path if not args.target_path.is_absolute() else args.target_path
+    run_results = load_json(target_dir / "run_results.json")
+    manifest_path = target_dir / "manifest.json"
+    manifest = load_json(manifest_path) if manifest_path.exists() else None
+
+    timings, regressions = record_run(
+        run_results=run_results,
+        manifest=manifest,
+        store_path=args.store,
+        yyyymm=args.yyyymm,
+        window=args.window,
+        min_history=args.min_history,
+        threshold=args.threshold,
+        min_seconds=args.min_seconds,
+    )
+    LOGGER.info("Recorded %d node timings to %s", len(timings), args.store)
+
+    if args.workgroup_name and args.database:
+        try:
+            from tools.run_dbt_dq import RedshiftDataAPI
+        except ImportError:  # executed as ./tools/profile_dbt_runs.py
+            from run_dbt_dq import RedshiftDataAPI
+
+        redshift = RedshiftDataAPI(
+            workgroup_name=args.workgroup_name,
+            database=args.database,
+            db_user=args.db_user,
+            secret_arn=args.secret_arn,
+        )
+        persist_timings(redshift=redshift, timings=timings, table=args.timings_table)
+
+    if regressions and args.fail_on_regression:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -47,6 +47,11 @@ from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 import boto3
 
+try:
+    from tools.profile_dbt_runs import extract_node_timings, persist_timings, record_run
+except ImportError:  # executed as ./tools/run_dbt_dq.py
+    from profile_dbt_runs import extract_node_timings, persist_timings, record_run
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -100,6 +105,23 @@ class RedshiftDataAPI:
     ) -> List[Dict[str, Any]]:
         """Execute ``sql`` and optionally return the resulting rows."""
 
+        statement_id = self._run(sql, parameters)
+        if not with_results:
+            return []
+
+        return list(self._yield_rows(statement_id))
+
+    def iter_rows(
+        self,
+        sql: str,
+        parameters: Optional[List[Dict[str, Any]]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Execute ``sql`` and yield rows as each result page is fetched."""
+
+        statement_id = self._run(sql, parameters)
+        yield from self._yield_rows(statement_id)
+
+    def _run(self, sql: str, parameters: Optional[List[Dict[str, Any]]]) -> str:
         kwargs = {
             "Database": self._database,
             "Sql": sql,
@@ -118,11 +140,7 @@ class RedshiftDataAPI:
         status = self._wait_for_statement(statement_id)
         if status != "FINISHED":
             raise RuntimeError(f"Statement {statement_id} failed with status {status}")
-
-        if not with_results:
-            return []
-
-        return list(self._yield_rows(statement_id))
+        return statement_id
 
     def _wait_for_statement(self, statement_id: str) -> str:
         while True:
@@ -405,6 +423,32 @@ def notify_slack(webhook_url: str, results: Iterable[DQResult]) -> None:
         LOGGER.error("Failed to send Slack notification: %s", exc)
 
 
+def record_timings(
+    args: argparse.Namespace,
+    run_results: Dict[str, Any],
+    manifest: Dict[str, Any],
+    redshift: RedshiftDataAPI,
+) -> None:
+    """Record per-test timings; failures are logged so DQ results are still persisted."""
+
+    if not (args.timings_store or args.timings_table):
+        return
+    try:
+        if args.timings_store:
+            timings, _ = record_run(
+                run_results=run_results,
+                manifest=manifest,
+                store_path=args.timings_store,
+                yyyymm=args.yyyymm,
+            )
+        else:
+            timings = extract_node_timings(run_results, manifest, args.yyyymm)
+        if args.timings_table:
+            persist_timings(redshift=redshift, timings=timings, table=args.timings_table)
+    except Exception as exc:  # noqa: BLE001 - profiling must not block DQ persistence
+        LOGGER.warning("Failed to record dbt test timings: %s", exc)
+
+
 def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument("--yyyymm", required=True, help="Target year-month for dq.results_yyyymm")
@@ -431,6 +475,15 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
         help="Maximum number of sample keys to persist per facility",
     )
     parser.add_argument("--slack-webhook-url", help="Optional Slack Incoming Webhook URL")
+    parser.add_argument(
+        "--timings-store",
+        type=pathlib.Path,
+        help="Append per-test timings to this JSON Lines store (see tools/profile_dbt_runs.py)",
+    )
+    parser.add_argument(
+        "--timings-table",
+        help="Insert per-test timings into this table, e.g. dq.dbt_node_timings (independent of --timings-store)",
+    )
     parser.add_argument(
         "--log-level",
         default=os.environ.get("LOG_LEVEL", "INFO"),
@@ -459,6 +512,8 @@ def main(argv: Optional[List[str]] = None) -> int:
         secret_arn=args.secret_arn,
     )
 
+    record_timings(args, run_results, manifest, redshift)
+
     dq_rows = gather_failed_results(
         run_results=run_results,
         manifest=manifest,
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Verify `_manifest.json` files under a `raw/yyyymm=...` tree.
+
+Every directory that contains a ``_manifest.json`` is verified concurrently.
+Within a directory the checks run cheapest first and stop at the first
+mismatch:
+
+1. ``schema``    – the manifest is valid JSON with the required keys and
+   integer ``records``/``bytes``.
+2. ``structure`` – the directory layout matches ``evaluate_target_structure``.
+3. ``files``     – data files exist and their byte size matches ``bytes``.
+4. ``records``   – the line count of the data files matches ``records``.
+5. ``hash``      – the digest of the stored data files matches ``hash.value``.
+
+The ``records`` and ``hash`` checks share a single read of the data files
+(``scan_data_file``); records are still compared before the digest.
+
+Data files are the entries named ``{facility_cd}_{yyyymm}_{file_type}_*``
+(see docs/03_s3_naming.md).  When a directory holds several of them, record
+counts are summed and the digest is computed over their contents
+concatenated in file name order.  A JSON report is written to stdout or to
+``--report``.
+"""
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import dataclasses
+import json
+import os
+import pathlib
+import sys
+from typing import Any, Optional
+
+try:
+    from tools.generate_manifest import HASH_ALGORITHMS, evaluate_target_structure, scan_data_file
+except ImportError:  # executed as ./tools/verify_manifest.py
+    from generate_manifest import HASH_ALGORITHMS, evaluate_target_structure, scan_data_file
+
+MANIFEST_NAME = "_manifest.json"
+REQUIRED_KEYS = ("yyyymm", "file_type", "facility_cd", "records", "hash", "created_at")
+
+
+@dataclasses.dataclass
+class VerificationResult:
+    """Outcome of verifying a single manifest directory."""
+
+    target: str
+    status: str
+    check: Optional[str] = None
+    message: Optional[str] = None
+    warnings: list[str] = dataclasses.field(default_factory=list)
+    files: list[str] = dataclasses.field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Verify _manifest.json files against the data files next to them.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("root", type=pathlib.Path, help="raw/ or raw/yyyymm=YYYY-MM directory to scan")
+    parser.add_argument("--has-header", action="store_true", help="Data files start with a header line")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 4,
+        help="Number of directories verified concurrently",
+    )
+    parser.add_argument("--report", type=pathlib.Path, help="Write the JSON report here instead of stdout")
+    parser.add_argument(
+        "--strict-path",
+        action="store_true",
+        help="Treat directory structure mismatches as failures instead of warnings.",
+    )
+    return parser.parse_args(argv)
+
+
+def find_manifests(root: pathlib.Path) -> list[pathlib.Path]:
+    return sorted(root.rglob(MANIFEST_NAME))
+
+
+def list_data_files(target_dir: pathlib.Path, manifest: dict[str, Any]) -> list[pathlib.Path]:
+    prefix = f"{manifest['facility_cd']}_{manifest['yyyymm']}_{manifest['file_type']}_"
+    return sorted(
+        path for path in target_dir.iterdir() if path.is_file() and path.name.startswith(prefix)
+    )
+
+
+def _is_count(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def verify_directory(
+    manifest_path: pathlib.Path, has_header: bool = False, strict_path: bool = False
+) -> VerificationResult:
+    target_dir = manifest_path.parent
+    result = VerificationResult(target=str(target_dir), status="ok")
+
+    def fail(check: str, message: str) -> VerificationResult:
+        result.status = "mismatch"
+        result.check = check
+        result.message = message
+        return result
+
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        return fail("schema", f"Cannot read manifest: {exc}")
+    if not isinstance(manifest, dict):
+        return fail("schema", "Manifest must be a JSON object.")
+    missing = [key for key in REQUIRED_KEYS if key not in manifest]
+    if missing:
+        return fail("schema", f"Missing required keys: {', '.join(missing)}")
+    hash_info = manifest["hash"]
+    if not isinstance(hash_info, dict) or hash_info.get("algorithm") not in HASH_ALGORITHMS:
+        return fail("schema", "hash.algorithm must be one of: " + ", ".join(sorted(HASH_ALGORITHMS)))
+    if not _is_count(manifest["records"]):
+        return fail("schema", f"records must be a non-negative integer, got {manifest['records']!r}")
+    if "bytes" in manifest and not _is_count(manifest["bytes"]):
+        return fail("schema", f"bytes must be a non-negative integer, got {manifest['bytes']!r}")
+
+    structure_warnings = evaluate_target_structure(
+        target_dir, str(manifest["yyyymm"]), str(manifest["file_type"])
+    )
+    if structure_warnings and strict_path:
+        return fail("structure", " ".join(structure_warnings))
+    result.warnings.extend(structure_warnings)
+
+    data_files = list_data_files(target_dir, manifest)
+    result.files = [path.name for path in data_files]
+    if not data_files:
+        return fail("files", "No data files found next to the manifest.")
+    total_bytes = sum(path.stat().st_size for path in data_files)
+    expected_bytes = manifest.get("bytes")
+    if expected_bytes is not None and expected_bytes != total_bytes:
+        return fail("files", f"Byte size mismatch: manifest={expected_bytes}, actual={total_bytes}")
+    if total_bytes == 0 and manifest["records"] > 0:
+        return fail("files", "Data files are empty but the manifest declares records.")
+
+    # One read per file: the digest continues across files in name order while
+    # the line counts are summed.
+    hash_func = HASH_ALGORITHMS[hash_info["algorithm"]]()
+    records = 0
+    for data_file in data_files:
+        records += scan_data_file(data_file, hash_info["algorithm"], has_header, hash_func=hash_func).records
+    if records != manifest["records"]:
+        return fail("records", f"Record count mismatch: manifest={manifest['records']}, actual={records}")
+
+    digest = hash_func.hexdigest()
+    if digest.lower() != str(hash_info.get("value", "")).lower():
+        return fail("hash", f"{hash_info['algorithm']} mismatch: manifest={hash_info.get('value')}, actual={digest}")
+
+    return result
+
+
+def verify_tree(
+    root: pathlib.Path, has_header: bool = False, strict_path: bool = False, workers: int = 4
+) -> list[VerificationResult]:
+    manifests = find_manifests(root)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [
+            executor.submit(verify_directory, path, has_header, strict_path) for path in manifests
+        ]
+        results = []
+        for path, future in zip(manifests, futures):
+            try:
+                results.append(future.result())
+            except (OSError, EOFError, ValueError) as exc:
+                results.append(
+                    VerificationResult(target=str(path.parent), status="error", message=str(exc))
+                )
+    return results
+
+
+def build_report(root: pathlib.Path, results: list[VerificationResult]) -> dict[str, Any]:
+    return {
+        "root": str(root),
+        "total": len(results),
+        "failed": sum(1 for result in results if not result.ok),
+        "results": [dataclasses.asdict(result) for result in results],
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+
+    if not args.root.is_dir():
+        print(f"Error: directory not found: {args.root}", file=sys.stderr)
+        return 1
+
+    results = verify_tree(args.root, args.has_header, args.strict_path, args.workers)
+    if not results:
+        print(f"Error: no {MANIFEST_NAME} found under {args.root}", file=sys.stderr)
+        return 1
+
+    report = json.dumps(build_report(args.root, results), ensure_ascii=False, indent=2) + "\n"
+    if args.report:
+        args.report.write_text(report, encoding="utf-8")
+        print(f"Report written to {args.report}")
+    else:
+        sys.stdout.write(report)
+
+    return 0 if all(result.ok for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
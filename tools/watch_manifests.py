@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""Keep `_manifest.json` files up to date while files land in an upload tree.
+
+The watcher follows ``upload_work/raw/yyyymm=<YYYY-MM>/<file_type>/`` (see
+docs/03_s3_naming.md) and, for every data file named
+``{facility_cd}_{yyyymm}_{file_type}_{seq}.{ext}``:
+
+1. waits until the file size and mtime have been stable for
+   ``--settle-seconds`` so that partially copied files are not read;
+2. hashes and counts it on a worker thread with ``scan_data_file``;
+3. rewrites the directory's ``_manifest.json`` atomically.
+
+Changes are detected with inotify when the optional ``inotify_simple``
+package is installed and by polling otherwise.  Each directory keeps a
+running digest over its files in name order, so a new file (normally the next
+``seq``) is read exactly once and earlier files are never re-read.  Only an
+out-of-order or modified file forces the directory to be rescanned.
+"""
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import dataclasses
+import datetime as dt
+import logging
+import os
+import pathlib
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import inotify_simple
+except ImportError:  # fall back to polling
+    inotify_simple = None
+
+try:
+    from tools.generate_manifest import (
+        COLUMN_STATS_MODES,
+        HASH_ALGORITHMS,
+        RAW_COLUMNS,
+        column_stats_enabled,
+        evaluate_target_structure,
+        merge_column_stats,
+        scan_data_file,
+        write_manifest,
+    )
+except ImportError:  # executed as ./tools/watch_manifests.py
+    from generate_manifest import (
+        COLUMN_STATS_MODES,
+        HASH_ALGORITHMS,
+        RAW_COLUMNS,
+        column_stats_enabled,
+        evaluate_target_structure,
+        merge_column_stats,
+        scan_data_file,
+        write_manifest,
+    )
+
+LOGGER = logging.getLogger(__name__)
+
+MANIFEST_NAME = "_manifest.json"
+DATA_FILE_PATTERN = re.compile(
+    r"^(?P<facility>\d{9})_(?P<yyyymm>\d{6})_(?P<file_type>[a-z0-9_]+)_(?P<seq>\d{3})\.[^.]+$"
+)
+
+Signature = Tuple[int, int]
+
+
+@dataclasses.dataclass
+class _FileEntry:
+    signature: Signature
+    records: int
+    compression: Optional[str]
+    uncompressed_bytes: int
+    column_stats: Optional[Dict[str, Any]]
+
+
+@dataclasses.dataclass
+class _DirectoryState:
+    facility_cd: Optional[str] = None
+    yyyymm: Optional[str] = None
+    file_type: Optional[str] = None
+    hash_func: Any = None
+    files: Dict[str, _FileEntry] = dataclasses.field(default_factory=dict)
+    failed: Dict[str, Signature] = dataclasses.field(default_factory=dict)
+
+
+def parse_data_file_name(name: str) -> Optional[Dict[str, str]]:
+    match = DATA_FILE_PATTERN.match(name)
+    return match.groupdict() if match else None
+
+
+def _signature(path: pathlib.Path) -> Signature:
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _iter_data_files(root: pathlib.Path) -> Iterable[pathlib.Path]:
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if parse_data_file_name(name):
+                yield pathlib.Path(dirpath) / name
+
+
+class _PollingSource:
+    """Report every data file under ``root`` after sleeping for ``timeout``."""
+
+    def __init__(self, root: pathlib.Path) -> None:
+        self._root = root
+
+    def wait(self, timeout: float) -> List[pathlib.Path]:
+        time.sleep(timeout)
+        return list(_iter_data_files(self._root))
+
+    def close(self) -> None:
+        pass
+
+
+class _InotifySource:
+    """Report files that were written, moved or created under ``root``."""
+
+    def __init__(self, root: pathlib.Path) -> None:
+        self._inotify = inotify_simple.INotify()
+        self._flags = inotify_simple.flags
+        self._mask = (
+            self._flags.CLOSE_WRITE | self._flags.MOVED_TO | self._flags.CREATE | self._flags.MODIFY
+        )
+        self._watches: Dict[int, pathlib.Path] = {}
+        self._watch_tree(root)
+
+    def _watch_tree(self, root: pathlib.Path) -> None:
+        for dirpath, _, _ in os.walk(root):
+            wd = self._inotify.add_watch(dirpath, self._mask)
+            self._watches[wd] = pathlib.Path(dirpath)
+
+    def wait(self, timeout: float) -> List[pathlib.Path]:
+        paths: List[pathlib.Path] = []
+        for event in self._inotify.read(timeout=int(timeout * 1000)):
+            parent = self._watches.get(event.wd)
+            if parent is None or not event.name:
+                continue
+            path = parent / event.name
+            if event.mask & self._flags.ISDIR:
+                # Directories created by prepare_upload.sh may already hold files.
+                self._watch_tree(path)
+                paths.extend(_iter_data_files(path))
+            elif parse_data_file_name(event.name):
+                paths.append(path)
+        return paths
+
+    def close(self) -> None:
+        self._inotify.close()
+
+
+class ManifestWatcher:
+    """Debounce landed files and rebuild the affected manifests off the main thread."""
+
+    def __init__(
+        self,
+        root: pathlib.Path,
+        has_header: bool = False,
+        hash_algorithm: str = "SHA256",
+        settle_seconds: float = 2.0,
+        poll_interval: float = 1.0,
+        workers: int = 4,
+        use_inotify: bool = True,
+        column_stats: bool = False,
+    ) -> None:
+        self.root = root
+        self.has_header = has_header
+        self.hash_algorithm = hash_algorithm
+        self.column_stats = column_stats
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        if use_inotify and inotify_simple is not None:
+            self._source = _InotifySource(root)
+        else:
+            if use_inotify:
+                LOGGER.info("inotify_simple is not installed; polling %s", root)
+            self._source = _PollingSource(root)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers))
+        self._futures: List[concurrent.futures.Future] = []
+        self._pending: Dict[pathlib.Path, Tuple[Signature, float]] = {}
+        self._processed: Dict[pathlib.Path, Signature] = {}
+        self._states: Dict[pathlib.Path, _DirectoryState] = {}
+        self._locks: Dict[pathlib.Path, threading.Lock] = defaultdict(threading.Lock)
+        self._layout_warned: Set[str] = set()
+
+    def observe(self, path: pathlib.Path) -> None:
+        try:
+            signature = _signature(path)
+        except FileNotFoundError:
+            self._pending.pop(path, None)
+            return
+        if self._processed.get(path) == signature:
+            return
+        previous = self._pending.get(path)
+        if previous is None or previous[0] != signature:
+            self._pending[path] = (signature, time.monotonic())
+
+    def _settled(self, force: bool = False) -> Dict[pathlib.Path, List[pathlib.Path]]:
+        now = time.monotonic()
+        ready: Dict[pathlib.Path, List[pathlib.Path]] = defaultdict(list)
+        for path, (signature, since) in list(self._pending.items()):
+            try:
+                current = _signature(path)
+            except FileNotFoundError:
+                del self._pending[path]
+                continue
+            if current != signature:
+                self._pending[path] = (current, now)
+            elif force or now - since >= self.settle_seconds:
+                del self._pending[path]
+                ready[path.parent].append(path)
+        return ready
+
+    def _submit(self, ready: Dict[pathlib.Path, List[pathlib.Path]]) -> None:
+        for directory, paths in ready.items():
+            self._futures.append(self._executor.submit(self._process_directory, directory, paths))
+        running = []
+        for future in self._futures:
+            if not future.done():
+                running.append(future)
+            elif future.exception() is not None:
+                LOGGER.error("Manifest update failed: %s", future.exception())
+        self._futures = running
+
+    def poll(self) -> None:
+        """Run one iteration: collect events, then hand settled files to the workers."""
+
+        for path in self._source.wait(self.poll_interval):
+            self.observe(path)
+        self._submit(self._settled())
+
+    def run_once(self) -> None:
+        """Process every data file currently under ``root`` and wait for completion."""
+
+        for path in _iter_data_files(self.root):
+            self.observe(path)
+        self._submit(self._settled(force=True))
+        self.drain()
+
+    def run(self, stop_event: Optional[threading.Event] = None) -> None:
+        stop_event = stop_event or threading.Event()
+        for path in _iter_data_files(self.root):
+            self.observe(path)
+        while not stop_event.is_set():
+            self.poll()
+
+    def drain(self) -> None:
+        for future in concurrent.futures.as_completed(list(self._futures)):
+            future.result()
+        self._futures = []
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self._source.close()
+
+    def _process_directory(self, directory: pathlib.Path, paths: List[pathlib.Path]) -> None:
+        with self._locks[directory]:
+            state = self._states.setdefault(directory, _DirectoryState())
+            changed = False
+            for path in sorted(paths):
+                try:
+                    signature = _signature(path)
+                except FileNotFoundError:
+                    continue
+                entry = state.files.get(path.name)
+                if entry is not None and entry.signature == signature:
+                    continue
+                if entry is not None or (state.files and path.name < max(state.files)):
+                    LOGGER.info("Out-of-order or modified file %s; rescanning %s", path.name, directory)
+                    state = self._rescan(directory, paths)
+                    changed = True
+                    break
+                changed = self._append(state, path, signature) or changed
+            state.failed = {
+                name: signature for name, signature in state.failed.items() if (directory / name).exists()
+            }
+            if state.failed:
+                # Publishing a manifest without these files would declare an
+                # incomplete directory ready; keep the previous manifest until
+                # the files are replaced and scan cleanly.
+                LOGGER.error(
+                    "Not updating %s: failed to scan %s", directory / MANIFEST_NAME, ", ".join(sorted(state.failed))
+                )
+            elif changed and state.files:
+                self._write(directory, state)
+
+    def _rescan(self, directory: pathlib.Path, settled: List[pathlib.Path]) -> _DirectoryState:
+        """Rebuild ``directory`` from settled files only.
+
+        A file is read when it is part of the settled batch or was already
+        processed and has not changed since.  Files that are still being
+        written are left to their own settle cycle.
+        """
+
+        settled_paths = set(settled)
+        state = _DirectoryState()
+        self._states[directory] = state
+        for path in sorted(directory.iterdir()):
+            if not path.is_file() or not parse_data_file_name(path.name):
+                continue
+            try:
+                signature = _signature(path)
+            except FileNotFoundError:
+                continue
+            if path not in settled_paths and (
+                path in self._pending or self._processed.get(path) != signature
+            ):
+                LOGGER.debug("Skipping unsettled file %s during rescan", path)
+                continue
+            self._append(state, path, signature)
+        return state
+
+    def _append(self, state: _DirectoryState, path: pathlib.Path, signature: Signature) -> bool:
+        parts = parse_data_file_name(path.name)
+        if parts is None:
+            return False
+        if state.facility_cd is None:
+            state.facility_cd = parts["facility"]
+            state.yyyymm = parts["yyyymm"]
+            state.file_type = parts["file_type"]
+        elif (parts["facility"], parts["yyyymm"], parts["file_type"]) != (
+            state.facility_cd,
+            state.yyyymm,
+            state.file_type,
+        ):
+            LOGGER.warning("Ignoring %s: it does not belong to the manifest of %s", path, path.parent)
+            self._processed[path] = signature
+            return False
+
+        collect_stats = self.column_stats
+        if collect_stats and not self.has_header and state.file_type not in RAW_COLUMNS:
+            collect_stats = False
+            if state.file_type not in self._layout_warned:
+                self._layout_warned.add(state.file_type)
+                LOGGER.warning(
+                    "No column layout for headerless %s files; column_stats are skipped", state.file_type
+                )
+
+        if state.hash_func is not None:
+            hash_func = state.hash_func.copy()
+        else:
+            hash_func = HASH_ALGORITHMS[self.hash_algorithm]()
+        try:
+            result = scan_data_file(
+                path,
+                self.hash_algorithm,
+                self.has_header,
+                hash_func=hash_func,
+                collect_stats=collect_stats,
+                columns=RAW_COLUMNS.get(state.file_type),
+            )
+        except (OSError, EOFError, ValueError) as exc:
+            LOGGER.error("Failed to scan %s: %s", path, exc)
+            # Retried once the file's signature changes (see ``observe``).
+            state.failed[path.name] = signature
+            self._processed[path] = signature
+            return False
+
+        state.failed.pop(path.name, None)
+        state.hash_func = hash_func
+        state.files[path.name] = _FileEntry(
+            signature=signature,
+            records=result.records,
+            compression=result.compression,
+            uncompressed_bytes=result.uncompressed_bytes,
+            column_stats=result.column_stats,
+        )
+        self._processed[path] = signature
+        LOGGER.info("Scanned %s (%d records)", path, result.records)
+        return True
+
+    def _write(self, directory: pathlib.Path, state: _DirectoryState) -> None:
+        for warning in evaluate_target_structure(directory, state.yyyymm, state.file_type):
+            LOGGER.warning("%s: %s", directory, warning)
+
+        entries = list(state.files.values())
+        manifest: Dict[str, Any] = {
+            "yyyymm": state.yyyymm,
+            "file_type": state.file_type,
+            "facility_cd": state.facility_cd,
+            "records": sum(entry.records for entry in entries),
+            "hash": {
+                "algorithm": self.hash_algorithm,
+                "value": state.hash_func.hexdigest(),
+            },
+            "created_at": dt.datetime.now(dt.timezone.utc).astimezone().isoformat(),
+            "bytes": sum(entry.signature[0] for entry in entries),
+        }
+        codecs = {entry.compression for entry in entries}
+        if len(codecs) == 1 and None not in codecs:
+            manifest["compression"] = codecs.pop()
+            manifest["uncompressed_bytes"] = sum(entry.uncompressed_bytes for entry in entries)
+        column_stats = merge_column_stats([entry.column_stats for entry in entries])
+        if column_stats:
+            manifest["column_stats"] = column_stats
+
+        manifest_path = directory / MANIFEST_NAME
+        write_manifest(manifest_path, manifest)
+        LOGGER.info("Manifest written to %s (%d files)", manifest_path, len(entries))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Watch an upload tree and keep _manifest.json files up to date.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("root", type=pathlib.Path, help="Upload tree to watch, e.g. upload_work/raw")
+    parser.add_argument("--has-header", action="store_true", help="Data files start with a header line")
+    parser.add_argument("--hash-algorithm", choices=sorted(HASH_ALGORITHMS.keys()), default="SHA256")
+    parser.add_argument(
+        "--settle-seconds",
+        type=float,
+        default=2.0,
+        help="Time a file's size and mtime must stay unchanged before it is read",
+    )
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Event wait / polling interval")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Hashing threads")
+    parser.add_argument("--polling", action="store_true", help="Poll even when inotify is available")
+    parser.add_argument("--once", action="store_true", help="Process existing files and exit")
+    parser.add_argument(
+        "--column-stats",
+        choices=COLUMN_STATS_MODES,
+        default="auto",
+        help="Record per-column statistics; 'auto' collects them when pyarrow is installed",
+    )
+    parser.add_argument(
+        "--log-level",
+        default=os.environ.get("LOG_LEVEL", "INFO"),
+        help="Python logging level",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s %(message)s")
+
+    if not args.root.is_dir():
+        print(f"Error: directory not found: {args.root}", file=sys.stderr)
+        return 1
+
+    watcher = ManifestWatcher(
+        root=args.root,
+        has_header=args.has_header,
+        hash_algorithm=args.hash_algorithm,
+        settle_seconds=args.settle_seconds,
+        poll_interval=args.poll_interval,
+        workers=args.workers,
+        use_inotify=not args.polling,
+        column_stats=column_stats_enabled(args.column_stats),
+    )
+    try:
+        if args.once:
+            watcher.run_once()
+        else:
+            LOGGER.info("Watching %s", args.root)
+            watcher.run()
+    except KeyboardInterrupt:
+        LOGGER.info("Stopping watcher")
+    finally:
+        watcher.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())